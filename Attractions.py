@@ -1,178 +1,275 @@
 import os
 import re
-import time
-import random
-import jieba
+import json
+import hashlib
 import pandas as pd
-import requests
-import matplotlib.pyplot as plt
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from snownlp import SnowNLP
-from collections import Counter
-from fake_useragent import UserAgent
-from bs4 import BeautifulSoup
-from pyecharts import options as opts
-from pyecharts.charts import Pie, Line, HeatMap, Bar, WordCloud
-ua = UserAgent()
-
-# 设置中文字体支持
-plt.rcParams['font.sans-serif'] = ['SimHei']  # 用来正常显示中文标签
-plt.rcParams['axes.unicode_minus'] = False  # 用来正常显示负号
+from nlp_engine import (NlpCache, load_stopwords, score_sentiments, shared_workers, tokenize_texts,
+                        tokenizer_version)
+from collections import Counter, deque
+from http_cache import CachedSession
+from fetch_policy import FetchPolicy
+from metrics import TargetRun, metrics, profiled
+from crawl_state import CrawlState
+from dedup import DedupIndex
+from extractors import get_backend
+from driver_pool import DriverPool
+from sinks import open_sinks
+from waits import RateLimiter, wait_for_document_ready, wait_for_stale
+from user_agents import random_user_agent
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+# selenium 与 pyecharts 只在爬取、绘图阶段导入，单独分析已有 CSV 时不必加载浏览器相关模块
 
 
 # 3. 数据预处理
-def preprocess_comments(df):
+def preprocess_comments(df, cache=None, workers=None):
     """
     数据预处理：清洗、分词、去停用词
     :param df: 包含评论的DataFrame
+    :param cache: NlpCache，提供时已分过词的评论直接取缓存
+    :param workers: 分词进程数，默认 CPU 核数
     :return: 处理后的DataFrame
     """
     # 数据清洗
     df = df.drop_duplicates()
     df = df.dropna()
-    # 中文分词
-    stopwords = set(line.strip() for line in open('file/baidu_stopwords.txt', encoding='utf-8'))
-
-    def process_text(text):
-        words = jieba.cut(text)
-        return ' '.join([word for word in words if word not in stopwords and len(word) > 1])
-
-    df['cleaned_comment'] = df['comment'].apply(process_text)
+    # 中文分词：相同评论只分一次，分块并行
+    stopwords = load_stopwords()
+    unique = list(dict.fromkeys(df['comment']))
+    cleaned = {}
+    if cache is not None:
+        version = tokenizer_version(stopwords)
+        cleaned = cache.get_many('tokens', version, unique)
+        unique = [text for text in unique if text not in cleaned]
+    new = {text: ' '.join(words) for text, words in zip(unique, tokenize_texts(unique, stopwords, workers=workers))}
+    if cache is not None and new:
+        cache.put_many('tokens', version, new)
+    cleaned.update(new)
+    df['cleaned_comment'] = df['comment'].map(cleaned)
     return df
 
 
 # 4. 情感分析
-def sentiment_analysis(df):
+def sentiment_analysis(df, workers=None, chunk_size=500, cache=None):
     """
-    使用SnowNLP进行情感分析
+    使用SnowNLP进行情感分析，去重后分块并行计算
     :param df: 包含评论的DataFrame
+    :param workers: 进程数，默认 CPU 核数
+    :param chunk_size: 每个进程任务的评论数
+    :param cache: NlpCache，提供时只计算新评论
     :return: 添加情感得分的DataFrame
     """
+    df['sentiment'] = score_sentiments(df['comment'], workers=workers, chunk_size=chunk_size, cache=cache)
+    return df
 
-    def get_sentiment(text):
-        s = SnowNLP(text)
-        return s.sentiments
 
-    df['sentiment'] = df['comment'].apply(get_sentiment)
-    return df
+def aggregate_sentiment(df):
+    """
+    一次分组计算各图表所需的聚合数据
+    :param df: 包含 cleaned_comment、sentiment 列（以及可选 date 列）的DataFrame
+    :return: {'word_counts': 词频, 'sentiment_counts': 各情感标签计数,
+              'monthly': 按月平均得分（含无评论的月份）, 'grid': (月, 小时) -> 平均得分}
+    """
+    labels = pd.cut(df['sentiment'], bins=[0, 0.4, 0.7, 1], labels=['消极', '中性', '积极'])
+    aggregates = {
+        # 预处理阶段已分好词，词云和柱状图共用同一份词频，不再重新分词
+        'word_counts': Counter(word for line in df['cleaned_comment'] for word in line.split()),
+        'sentiment_counts': labels.value_counts(),
+    }
+    if 'date' in df.columns:
+        dates = pd.to_datetime(df['date'], errors='coerce')
+        valid = dates.notna()
+        dates = dates[valid]
+        sentiment = df['sentiment'][valid]
+        monthly = sentiment.groupby(dates.dt.to_period('M')).mean()
+        if not monthly.empty:
+            # 与按月重采样一致，补齐中间没有评论的月份
+            monthly = monthly.reindex(pd.period_range(monthly.index.min(), monthly.index.max(), freq='M'))
+        aggregates['monthly'] = monthly
+        aggregates['grid'] = sentiment.groupby([dates.dt.month.rename('month'), dates.dt.hour.rename('hour')]).mean()
+    return aggregates
+
+
+class StreamingAggregates:
+    """逐块累加图表所需的聚合量，结果与对全部数据调用 aggregate_sentiment 相同"""
+
+    def __init__(self):
+        self.word_counts = Counter()
+        self.label_counts = None
+        self.monthly = None  # 每月得分的 sum / count
+        self.grid = None  # 每个 (月, 小时) 格子的 sum / count
+
+    @staticmethod
+    def _add(total, part):
+        return part if total is None else total.add(part, fill_value=0)
+
+    def update(self, df):
+        """并入一个已完成分词和情感分析的分块"""
+        self.word_counts.update(word for line in df['cleaned_comment'] for word in line.split())
+        labels = pd.cut(df['sentiment'], bins=[0, 0.4, 0.7, 1], labels=['消极', '中性', '积极'])
+        self.label_counts = self._add(self.label_counts, labels.value_counts(sort=False))
+        if 'date' in df.columns:
+            dates = pd.to_datetime(df['date'], errors='coerce')
+            valid = dates.notna()
+            dates = dates[valid]
+            sentiment = df['sentiment'][valid]
+            self.monthly = self._add(self.monthly, sentiment.groupby(dates.dt.to_period('M')).agg(['sum', 'count']))
+            self.grid = self._add(self.grid, sentiment.groupby(
+                [dates.dt.month.rename('month'), dates.dt.hour.rename('hour')]).agg(['sum', 'count']))
+
+    def result(self):
+        """返回与 aggregate_sentiment 相同结构的聚合结果"""
+        aggregates = {
+            'word_counts': self.word_counts,
+            'sentiment_counts': self.label_counts.astype(int).sort_values(ascending=False),
+        }
+        if self.monthly is not None:
+            monthly = (self.monthly['sum'] / self.monthly['count']).sort_index()
+            if not monthly.empty:
+                monthly = monthly.reindex(pd.period_range(monthly.index.min(), monthly.index.max(), freq='M'))
+            aggregates['monthly'] = monthly
+            aggregates['grid'] = (self.grid['sum'] / self.grid['count']).sort_index()
+        return aggregates
 
 
 # 5. 可视化（使用pyecharts实现交互式图表）
 def generate_visualizations(df, attraction_name="杭州西湖"):
     """
-    生成五种可视化图表（使用pyecharts）
+    生成五种可视化图表（使用pyecharts），合并为一个仪表盘页面
     :param df: 包含处理后的数据和情感得分的DataFrame
     :param attraction_name: 景点名称
     """
-    # 确保结果目录存在
-    os.makedirs('result', exist_ok=True)
-
-    # 1. 词云图
-    all_text = ' '.join(df['cleaned_comment'])
-    words = jieba.lcut(all_text)
-    word_counts = Counter(words)
-    word_data = [(word, count) for word, count in word_counts.items() if len(word) > 1]
-
-    wc = (
+    return render_charts(aggregate_sentiment(df), attraction_name)
+
+
+# 图表代码改动时调高版本号，使缓存的图表配置全部失效
+CHART_VERSION = 1
+
+DASHBOARD_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>{title}</title>
+{scripts}
+</head>
+<body>
+{divs}
+<script>
+{inits}
+</script>
+</body>
+</html>
+"""
+
+
+def chart_snapshot(aggregates, max_words=200):
+    """
+    把聚合结果压缩为各图表直接使用的数据，可序列化为 JSON
+    :param aggregates: aggregate_sentiment 或 StreamingAggregates.result() 的返回值
+    :param max_words: 词云保留的高频词数
+    :return: {图表名: 数据}，没有日期列时不含趋势图和热力图
+    """
+    word_counts = aggregates['word_counts']
+    ranked = word_counts.most_common()
+    snapshot = {
+        'wordcloud': [[word, count] for word, count in ranked if len(word) > 1][:max_words],
+        'sentiment_pie': [[str(label), int(count)] for label, count in aggregates['sentiment_counts'].items()],
+    }
+    if 'monthly' in aggregates:
+        monthly = aggregates['monthly']
+        snapshot['sentiment_trend'] = [[month, None if pd.isna(value) else round(float(value), 3)]
+                                       for month, value in zip(monthly.index.strftime('%Y-%m'), monthly.values)]
+    if 'grid' in aggregates:
+        # 按月份、小时排序，只包含有评论的格子
+        snapshot['heatmap'] = [[str(month), str(hour), round(float(value), 2)]
+                               for (month, hour), value in aggregates['grid'].items()]
+    snapshot['bar_chart'] = [[word, count] for word, count in ranked[:20]]
+    return snapshot
+
+
+def _wordcloud_chart(data, attraction_name):
+    from pyecharts import options as opts
+    from pyecharts.charts import WordCloud
+
+    return (
         WordCloud()
-        .add("", word_data, word_size_range=[20, 100], shape="diamond")
+        .add("", [tuple(item) for item in data], word_size_range=[20, 100], shape="diamond")
         .set_global_opts(
             title_opts=opts.TitleOpts(title=f"{attraction_name}评论高频词云图"),
             tooltip_opts=opts.TooltipOpts(is_show=True)
         )
     )
-    wc.render(f'result/{attraction_name}_wordcloud.html')
 
-    # 2. 情感分布饼图
-    df['sentiment_label'] = pd.cut(df['sentiment'],
-                                   bins=[0, 0.4, 0.7, 1],
-                                   labels=['消极', '中性', '积极'])
-    sentiment_counts = df['sentiment_label'].value_counts()
 
-    pie = (
+def _sentiment_pie_chart(data, attraction_name):
+    from pyecharts import options as opts
+    from pyecharts.charts import Pie
+
+    return (
         Pie()
-        .add("", [list(z) for z in zip(sentiment_counts.index.tolist(), sentiment_counts.values.tolist())])
+        .add("", data)
         .set_global_opts(
             title_opts=opts.TitleOpts(title=f"{attraction_name}评论情感分布"),
             legend_opts=opts.LegendOpts(orient="vertical", pos_top="15%", pos_left="2%")
         )
         .set_series_opts(label_opts=opts.LabelOpts(formatter="{b}: {c} ({d}%)"))
     )
-    pie.render(f'result/{attraction_name}_sentiment_pie.html')
 
-    # 3. 情感趋势折线图（按月份）
-    if 'date' in df.columns:
-        df['date'] = pd.to_datetime(df['date'], errors='coerce')
-        df = df.dropna(subset=['date'])
-        monthly_sentiment = df.resample('M', on='date')['sentiment'].mean()
-
-        line = (
-            Line()
-            .add_xaxis(monthly_sentiment.index.strftime('%Y-%m').tolist())
-            .add_yaxis("情感得分", monthly_sentiment.values.round(3).tolist(),
-                       is_smooth=True,
-                       markpoint_opts=opts.MarkPointOpts(data=[opts.MarkPointItem(type_="max")]))
-            .set_global_opts(
-                title_opts=opts.TitleOpts(title=f"{attraction_name}评论情感趋势"),
-                xaxis_opts=opts.AxisOpts(name="月份"),
-                yaxis_opts=opts.AxisOpts(name="平均情感得分"),
-                datazoom_opts=[opts.DataZoomOpts()],  # 添加缩放功能
-                tooltip_opts=opts.TooltipOpts(trigger="axis", axis_pointer_type="cross")
-            )
+
+def _sentiment_trend_chart(data, attraction_name):
+    from pyecharts import options as opts
+    from pyecharts.charts import Line
+
+    return (
+        Line()
+        .add_xaxis([month for month, _ in data])
+        .add_yaxis("情感得分", [value for _, value in data],
+                   is_smooth=True,
+                   markpoint_opts=opts.MarkPointOpts(data=[opts.MarkPointItem(type_="max")]))
+        .set_global_opts(
+            title_opts=opts.TitleOpts(title=f"{attraction_name}评论情感趋势"),
+            xaxis_opts=opts.AxisOpts(name="月份"),
+            yaxis_opts=opts.AxisOpts(name="平均情感得分"),
+            datazoom_opts=[opts.DataZoomOpts()],  # 添加缩放功能
+            tooltip_opts=opts.TooltipOpts(trigger="axis", axis_pointer_type="cross")
         )
-        line.render(f'result/{attraction_name}_sentiment_trend.html')
+    )
 
-    # 4. 热力图（使用pyecharts）
-    if 'date' in df.columns:
-        # 提取月份和小时信息
-        df['month'] = df['date'].dt.month
-        df['hour'] = df['date'].dt.hour
-
-        # 创建热力图数据
-        heatmap_data = []
-        for month in range(1, 13):
-            for hour in range(0, 24):
-                subset = df[(df['month'] == month) & (df['hour'] == hour)]
-                if not subset.empty:
-                    avg_sentiment = subset['sentiment'].mean()
-                    heatmap_data.append([str(month), str(hour), round(avg_sentiment, 2)])
-
-        heatmap = (
-            HeatMap()
-            .add_xaxis([str(i) for i in range(1, 13)])
-            .add_yaxis(
-                "情感得分",
-                [str(i) for i in range(24)],
-                heatmap_data,
-                label_opts=opts.LabelOpts(is_show=True, position="inside"),
-            )
-            .set_global_opts(
-                title_opts=opts.TitleOpts(title=f"{attraction_name}情感得分热力图 (按月份和小时)"),
-                visualmap_opts=opts.VisualMapOpts(
-                    min_=0, max_=1,
-                    range_color=["#313695", "#4575b4", "#74add1", "#abd9e9", "#e0f3f8", "#ffffbf", "#fee090", "#fdae61",
-                                 "#f46d43", "#d73027", "#a50026"]
-                ),
-                tooltip_opts=opts.TooltipOpts(formatter="{b}月{c}时: {d}分"),
-                legend_opts=opts.LegendOpts(is_show=False),
-            )
+
+def _heatmap_chart(data, attraction_name):
+    from pyecharts import options as opts
+    from pyecharts.charts import HeatMap
+
+    return (
+        HeatMap()
+        .add_xaxis([str(i) for i in range(1, 13)])
+        .add_yaxis(
+            "情感得分",
+            [str(i) for i in range(24)],
+            data,
+            label_opts=opts.LabelOpts(is_show=True, position="inside"),
         )
-        heatmap.render(f'result/{attraction_name}_heatmap.html')
+        .set_global_opts(
+            title_opts=opts.TitleOpts(title=f"{attraction_name}情感得分热力图 (按月份和小时)"),
+            visualmap_opts=opts.VisualMapOpts(
+                min_=0, max_=1,
+                range_color=["#313695", "#4575b4", "#74add1", "#abd9e9", "#e0f3f8", "#ffffbf", "#fee090", "#fdae61",
+                             "#f46d43", "#d73027", "#a50026"]
+            ),
+            tooltip_opts=opts.TooltipOpts(formatter="{b}月{c}时: {d}分"),
+            legend_opts=opts.LegendOpts(is_show=False),
+        )
+    )
 
-    # 5. 柱状图（使用pyecharts）
-    # 提取所有词语
-    all_words = ' '.join(df['cleaned_comment']).split()
-    word_freq = Counter(all_words)
-    top_words = word_freq.most_common(20)
 
-    bar = (
+def _bar_chart(data, attraction_name):
+    from pyecharts import options as opts
+    from pyecharts.charts import Bar
+
+    return (
         Bar()
-        .add_xaxis([word[0] for word in top_words])
-        .add_yaxis("出现频率", [word[1] for word in top_words])
+        .add_xaxis([word for word, _ in data])
+        .add_yaxis("出现频率", [count for _, count in data])
         .set_global_opts(
             title_opts=opts.TitleOpts(title=f"{attraction_name}评论高频词TOP20"),
             xaxis_opts=opts.AxisOpts(name="词语", axislabel_opts=opts.LabelOpts(rotate=45)),
@@ -190,68 +287,310 @@ def generate_visualizations(df, attraction_name="杭州西湖"):
             )
         )
     )
-    bar.render(f'result/{attraction_name}_bar_chart.html')
+
+
+CHART_BUILDERS = {
+    'wordcloud': _wordcloud_chart,
+    'sentiment_pie': _sentiment_pie_chart,
+    'sentiment_trend': _sentiment_trend_chart,
+    'heatmap': _heatmap_chart,
+    'bar_chart': _bar_chart,
+}
+
+
+def _snapshot_hash(kind, data, attraction_name):
+    payload = json.dumps([CHART_VERSION, kind, attraction_name, data], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def render_charts(aggregates, attraction_name="杭州西湖", output_dir='result', assets_host=None):
+    """
+    根据聚合结果渲染五种图表，合并为一个仪表盘页面 <景点>_dashboard.html
+    图表配置按快照哈希缓存在 <景点>_dashboard.json 中，数据没有变化的图表不再重新生成
+    :param aggregates: aggregate_sentiment 或 StreamingAggregates.result() 的返回值
+    :param attraction_name: 景点名称
+    :param output_dir: 输出目录
+    :param assets_host: echarts 脚本所在的地址，多个景点的页面共用；默认为 pyecharts 的在线资源
+    :return: 仪表盘页面路径
+    """
+    from pyecharts.datasets import FILENAMES
+    from pyecharts.globals import CurrentConfig
+
+    # 确保结果目录存在
+    os.makedirs(output_dir, exist_ok=True)
+    page_path = os.path.join(output_dir, f'{attraction_name}_dashboard.html')
+    cache_path = os.path.join(output_dir, f'{attraction_name}_dashboard.json')
+    assets_host = assets_host or CurrentConfig.ONLINE_HOST
+
+    snapshot = chart_snapshot(aggregates)
+    cached = {}
+    if os.path.exists(cache_path):
+        with open(cache_path, encoding='utf-8') as f:
+            cached = json.load(f).get('charts', {})
+
+    charts, rendered = {}, 0
+    for kind, data in snapshot.items():
+        digest = _snapshot_hash(kind, data, attraction_name)
+        if cached.get(kind, {}).get('hash') == digest:
+            charts[kind] = cached[kind]
+            continue
+        chart = CHART_BUILDERS[kind](data, attraction_name)
+        # 配置中没有 JsCode，可以压缩为紧凑的 JSON 以减小页面体积
+        options = json.dumps(json.loads(chart.dump_options()), ensure_ascii=False, separators=(',', ':'))
+        charts[kind] = {'hash': digest, 'options': options, 'dependencies': chart.js_dependencies.items}
+        rendered += 1
+    skipped = len(charts) - rendered
+    metrics.inc('charts_rendered_total', rendered)
+    metrics.inc('charts_skipped_total', skipped)
+
+    if rendered or charts.keys() != cached.keys() or not os.path.exists(page_path):
+        dependencies = list(dict.fromkeys(dep for chart in charts.values() for dep in chart['dependencies']))
+        scripts = '\n'.join(f'    <script src="{assets_host}{FILENAMES[dep][0]}.{FILENAMES[dep][1]}"></script>'
+                            for dep in dependencies)
+        divs = '\n'.join(f'<div id="{kind}" style="width:900px;height:500px;"></div>' for kind in charts)
+        inits = '\n'.join(f'echarts.init(document.getElementById("{kind}")).setOption({chart["options"]});'
+                          for kind, chart in charts.items())
+        with open(page_path, 'w', encoding='utf-8') as f:
+            f.write(DASHBOARD_TEMPLATE.format(title=f'{attraction_name}评论分析', scripts=scripts, divs=divs,
+                                              inits=inits))
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump({'snapshot': snapshot, 'charts': charts}, f, ensure_ascii=False)
+    print(f"图表: 重新生成 {rendered} 个，未变化跳过 {skipped} 个，仪表盘 {page_path}")
+    return page_path
+
+# 在浏览器内一次性提取整页评论，字段含义与 extractors 中的 BeautifulSoup 实现一致
+COMMENTS_JS = """
+return Array.from(document.getElementsByTagName('li'))
+    .filter(li => li.getAttribute('class') === 'e_comment_item clrfix')
+    .map(li => {
+        const more = li.querySelector('a.seeMore');
+        const content = li.querySelector('div.e_comment_content');
+        const addInfo = li.querySelector('div.e_comment_add_info');
+        const dateLi = addInfo ? addInfo.querySelector('li') : null;
+        return {
+            more: more ? more.getAttribute('href') : null,
+            text: content ? content.textContent.trim() : null,
+            date: dateLi ? dateLi.textContent.trim() : null,
+        };
+    });
+"""
+
+
+def create_browser():
+    """初始化浏览器"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    service = Service(executable_path='../chromedriver.exe')
+    options = webdriver.ChromeOptions()
+    options.add_argument('--disable-blink-features=AutomationControlled')
+    options.add_experimental_option('excludeSwitches', ['enable-automation'])
+    options.add_argument('--disable-infobars')
+    options.add_argument('--disable-extensions')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--start-maximized')
+    options.add_argument('--disable-popup-blocking')
+    options.add_argument('--disable-notifications')
+    options.add_argument(f'{random_user_agent()}')
+    return webdriver.Chrome(service=service, options=options)
+
+
+# 输出列及类型：Parquet 中日期为时间戳、情感得分为浮点数
+COMMENT_COLUMNS = [('comment', 'string'), ('date', 'timestamp')]
+PROCESSED_COLUMNS = COMMENT_COLUMNS + [('cleaned_comment', 'string'), ('sentiment', 'float')]
+
+
+def read_comment_csv(csv_path, chunksize=10000):
+    """分块读取已保存的 _comments.csv"""
+    return pd.read_csv(csv_path, chunksize=chunksize, encoding='utf-8-sig', dtype=str)
+
+
+def analyze_comment_stream(chunks, attraction_name="杭州西湖", cache=None, workers=None, formats=('csv',),
+                           max_seen=100000):
+    """
+    流式分析：逐块清洗、分词、打分并累加聚合量，内存占用与评论总量无关
+    多进程时各分块共用一个预热过的进程池，jieba 词典与 SnowNLP 模型每个进程只加载一次
+    :param chunks: 可迭代的DataFrame分块，包含 comment、date 列
+    :param attraction_name: 景点名称
+    :param cache: NlpCache
+    :param workers: 分词与情感分析的进程数
+    :param formats: 处理结果的输出格式，'csv'、'parquet' 的任意组合
+    :param max_seen: 跨分块去重时最多保留的行哈希数，超出后丢弃最早的，内存占用有上限
+    :return: 处理后的评论数
+    """
+    os.makedirs('result', exist_ok=True)
+    processed_path = f'result/{attraction_name}_comments_processed.csv'
+    aggregates = StreamingAggregates()
+    # 最近 max_seen 行内容的哈希，用于跨分块去重
+    seen, order = set(), deque()
+    total = 0
+    # 每次都分析全部评论，Parquet 中该景点的分区整体替换
+    sink = open_sinks(processed_path, PROCESSED_COLUMNS, 'qunar_processed', formats=formats,
+                      date_field='date', partitions={'attraction': attraction_name}, replace=True)
+    workers = workers or os.cpu_count() or 1
+    with shared_workers(workers) if workers > 1 else nullcontext():
+        for chunk in chunks:
+            keys = pd.util.hash_pandas_object(chunk, index=False)
+            mask = ~keys.isin(seen) & ~keys.duplicated()
+            chunk = chunk[mask]
+            seen.update(keys[mask])
+            order.extend(keys[mask])
+            while len(order) > max_seen:
+                seen.discard(order.popleft())
+            if chunk.empty:
+                continue
+            chunk = preprocess_comments(chunk, cache=cache, workers=workers)
+            chunk = sentiment_analysis(chunk, workers=workers, cache=cache)
+            # 处理结果逐块追加写入
+            sink.write(chunk.to_dict('records'))
+            aggregates.update(chunk)
+            total += len(chunk)
+            print(f"已分析 {total} 条评论")
+    sink.close()
+    if total:
+        print(f"处理后的数据已保存到 {processed_path}")
+        with metrics.timer('analysis_seconds', stage='charts'):
+            render_charts(aggregates.result(), attraction_name)
+    return total
+
+
+def analyze_csv(csv_path, attraction_name="杭州西湖", chunksize=10000, workers=None):
+    """对已有的 _comments.csv 做流式分析并生成图表"""
+    nlp_cache = NlpCache()
+    try:
+        return analyze_comment_stream(read_comment_csv(csv_path, chunksize), attraction_name,
+                                      cache=nlp_cache, workers=workers)
+    finally:
+        nlp_cache.print_stats()
+        nlp_cache.close()
+
 
 class QuNaRCrawler:
     def __init__(self, attraction_name="杭州西湖",
-                 attraction_url='https://travel.qunar.com/p-oi708952-xihufengjingmingsheng'):
+                 attraction_url='https://travel.qunar.com/p-oi708952-xihufengjingmingsheng',
+                 state_path='cache/qunar_state.sqlite', parser=None, driver=None, page_interval=2.0,
+                 extraction='js', detail_workers=4, formats=('csv',), dedup_path='cache/dedup.sqlite'):
         # 初始化景点信息
         self.attraction_name = attraction_name
         self.attraction_url = attraction_url
-        # 初始化浏览器
-        self.service = Service(executable_path='../chromedriver.exe')
-        self.options = webdriver.ChromeOptions()
-        self.options.add_argument('--disable-blink-features=AutomationControlled')
-        self.options.add_experimental_option('excludeSwitches', ['enable-automation'])
-        self.options.add_argument('--disable-infobars')
-        self.options.add_argument('--disable-extensions')
-        self.options.add_argument('--no-sandbox')
-        self.options.add_argument('--disable-dev-shm-usage')
-        self.options.add_argument('--start-maximized')
-        self.options.add_argument('--disable-popup-blocking')
-        self.options.add_argument('--disable-notifications')
-        self.options.add_argument(f'{ua.random}')
-        self.driver = webdriver.Chrome(service=self.service, options=self.options)
+        # 输出格式：'csv'、'parquet' 的任意组合
+        self.formats = formats
+        # 爬取状态：已保存的评论与翻页进度，中断后可续爬
+        self.state = CrawlState(state_path)
+        self.record_kind = f'comment:{attraction_url}'
+        # 放弃的评论键（近似重复、完整评论页返回不可重试的错误），续爬时不再请求、也不计入新增
+        self.dropped_kind = f'dropped:{attraction_url}'
+        self.page_cursor = f'page:{attraction_url}'
+        # 近似重复评论的指纹索引（精确重复由爬取状态中的记录键判断）
+        self.dedup = DedupIndex(dedup_path, namespace=f'qunar:{attraction_url}')
+        # 页面解析后端，默认 lxml
+        self.parser = get_backend(parser)
+        # 'js' 在浏览器内一次提取整页评论；'html' 取 page_source 后在本地解析
+        self.extraction = extraction
+        # 完整评论页的后台请求线程池，与浏览器翻页并行
+        self.detail_pool = ThreadPoolExecutor(max_workers=detail_workers)
+        self._pending = []
+        self._pending_keys = set()
+        # 初始化浏览器，传入 driver 时复用浏览器池中的实例，由池负责关闭
+        self.owns_driver = driver is None
+        self.driver = driver or create_browser()
+        self.pages_crawled = 0
+        # 翻页之间的最小间隔（秒），与页面就绪等待分开控制
+        self.limiter = RateLimiter(page_interval)
         self.comments = []
         self.dates = []
-        self.session = requests.Session()
+        # 完整评论页内容基本不变，缓存后重复运行只发送条件请求
+        self.session = CachedSession()
         self.session.headers.update({
-            'User-Agent': ua.random,
+            'User-Agent': random_user_agent(),
             'Connection': 'keep-alive'
         })
+        # 完整评论页的限速与重试策略，速率随站点响应自适应
+        self.policy = FetchPolicy(rate=detail_workers)
+        self.detail_failures = 0  # 因瞬时错误重试后仍未取到的完整评论数，下次运行补抓
 
-    def scrape_qunar_comments(self, pages=20):
+    def scrape_qunar_comments(self, pages=20, stream=False):
         """
         爬取去哪儿网景点评论
         :param pages: 需要爬取的页数
-        :return: 包含评论和日期的DataFrame
+        :param stream: 为 True 时不把已保存的评论载入内存，结果文件从爬取状态库分块写出
+        :return: 包含评论和日期的DataFrame；stream 为 True 时只包含本次新增的评论
         """
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
         print(f"开始爬取: {self.attraction_name}")
+        stored = 0
+        if stream:
+            # 流式模式只统计之前运行已保存的评论数，不载入内存
+            stored = self.state.count(self.record_kind)
+        else:
+            # 载入之前运行已保存的评论
+            for record in self.state.records(self.record_kind):
+                self.comments.append(record['comment'])
+                self.dates.append(record['date'])
+        # 上次中断时已完成的页数，续爬时直接翻过这些页
+        done_pages = self.state.get_cursor(self.page_cursor, 0)
+        if stored or self.comments or done_pages:
+            print(f"已保存 {stored + len(self.comments)} 条评论，从第 {done_pages + 1} 页继续")
         self.driver.get(self.attraction_url)
-        time.sleep(3)  # 等待页面加载
+        wait_for_document_ready(self.driver)  # 等待页面加载
 
+        finished = False
         for page in range(1, pages + 1):
             try:
                 # 等待评论加载完成
-                WebDriverWait(self.driver, 15).until(
-                    EC.presence_of_element_located((By.CLASS_NAME, 'b_comment_box'))
-                )
-                self.extract_data(self.driver.page_source)
-                print(f'已抓取第 {page}/{pages} 页，累计评论数: {len(self.comments)}')
-                time.sleep(2)  # 防止请求过快
+                with metrics.timer('crawler_driver_wait_seconds', wait='comment_box'):
+                    WebDriverWait(self.driver, 15).until(
+                        EC.presence_of_element_located((By.CLASS_NAME, 'b_comment_box'))
+                    )
+                self.pages_crawled += 1
+                if page > done_pages:
+                    if self.extraction == 'js':
+                        with metrics.timer('crawler_parse_seconds', site='qunar', page='list_js'):
+                            items = self.driver.execute_script(COMMENTS_JS)
+                        new_count = self.extract_items(items, page)
+                    else:
+                        new_count = self.extract_data(self.driver.page_source, page)
+                    print(f'已抓取第 {page}/{pages} 页，新增 {new_count} 条，累计评论数: {stored + len(self.comments)}')
+                    if new_count == 0 and done_pages == 0:
+                        # 评论按时间倒序，整页都已保存说明之后都是旧评论
+                        print("本页没有新评论，停止翻页")
+                        finished = True
+                        break
 
                 # 尝试翻页
                 next_buttons = self.driver.find_elements(By.XPATH, '//a[@class="page next"]')
                 if next_buttons:
+                    first_comment = self.driver.find_elements(By.CSS_SELECTOR, 'li.e_comment_item')
+                    if page >= done_pages:
+                        self.limiter.wait()  # 防止请求过快
                     next_buttons[0].click()
-                    time.sleep(random.uniform(2, 4))
+                    # 旧的第一条评论被替换即表示新一页已加载
+                    if first_comment:
+                        wait_for_stale(self.driver, first_comment[0])
                 else:
                     print("没有找到下一页按钮，可能已到最后一页")
+                    finished = True
                     break
 
             except Exception as e:
                 print(f"爬取第 {page} 页时出错: {str(e)}")
+                metrics.inc('crawler_errors_total', site='qunar', stage='page')
                 break
+        else:
+            finished = True
+        # 合并最后一页仍在获取的完整评论
+        self.flush_pending()
+        self.policy.print_stats()
+        if self.detail_failures:
+            # 游标停在第一个有瞬时失败评论的页之前，下次运行从该页补抓
+            print(f"{self.detail_failures} 条完整评论获取失败，下次运行时重新抓取")
+        elif finished:
+            # 完整结束后清除游标，下次从第一页开始增量更新
+            self.state.clear_cursor(self.page_cursor)
 
         # 创建DataFrame
         df = pd.DataFrame({
@@ -263,95 +602,268 @@ class QuNaRCrawler:
         os.makedirs('result', exist_ok=True)
 
         csv_path = f'result/{self.attraction_name}_comments.csv'
-        df.to_csv(csv_path, index=False, encoding='utf_8_sig')
+        with self.open_sinks(csv_path, COMMENT_COLUMNS, 'qunar') as sink:
+            if stream:
+                for records in self.state.iter_records(self.record_kind):
+                    sink.write(records)
+            else:
+                sink.write(df.to_dict('records'))
         print(f"评论已保存到 {csv_path}")
         return df
 
-    def extract_data(self, content):
-        soup = BeautifulSoup(content, 'html.parser')
-        # 获取评论
-        comments = soup.find_all("li", attrs={"class": "e_comment_item clrfix"})
-        for comment in comments:
-            try:
-                a = comment.find("a", attrs={"class": "seeMore"})
-                if a and a.get('href'):
-                    response = self.session.get(a.get('href'), timeout=20)
-                    if response.status_code != 200:
-                        print(f"请求失败，状态码: {response.status_code}")
+    @staticmethod
+    def comment_key(item):
+        """评论的唯一键：优先使用完整评论链接，否则使用日期与评论摘要的哈希，不同日期的相同短评分别保存"""
+        if item['more']:
+            return item['more']
+        return hashlib.sha1(f"{item['date'] or ''}|{item['text'] or ''}".encode('utf-8')).hexdigest()
+
+    def parse_comment_items(self, content):
+        """从页面HTML中解析评论条目，字段与 COMMENTS_JS 返回的一致"""
+        with metrics.timer('crawler_parse_seconds', site='qunar', page='list_html'):
+            doc = self.parser.parse(content)
+            return [{
+                'more': self.parser.see_more_href(comment),
+                'text': self.parser.comment_text(comment),
+                'date': self.parser.comment_date(comment),
+            } for comment in self.parser.comment_items(doc)]
+
+    def extract_data(self, content, page=None):
+        """
+        提取页面HTML中的评论与日期
+        :return: 新增评论数
+        """
+        return self.extract_items(self.parse_comment_items(content), page)
+
+    def extract_items(self, items, page=None):
+        """
+        处理评论条目：已保存或近似重复的评论跳过，完整评论页交给线程池后台获取
+        结果在下一页提取前（即浏览器翻页期间）按原顺序合并
+        :param items: [{'more': 完整评论链接, 'text': 评论摘要, 'date': 日期文字}, ...]
+        :param page: 所在页码，该页全部保存后写入翻页游标
+        :return: 新增评论数
+        """
+        self.flush_pending()
+        batch = []
+        for item in items:
+            key = self.comment_key(item)
+            if (key in self._pending_keys or self.state.has_record(self.record_kind, key)
+                    or self.state.has_record(self.dropped_kind, key)):
+                continue
+            # 摘要即全文的评论在这里就能判断近似重复，不再占用后续的分词与情感分析
+            if not item['more'] and self.dedup.is_near_duplicate(item['text']):
+                self.drop_comment(key, 'near_duplicate')
+                metrics.inc('crawler_duplicates_total', site='qunar', kind='near')
+                continue
+            future = self.detail_pool.submit(self.fetch_full_comment, item['more']) if item['more'] else None
+            batch.append((key, item, future))
+            self._pending_keys.add(key)
+        self._pending.append((page, batch))
+        return len(batch)
+
+    def fetch_full_comment(self, href):
+        """
+        在线程池中请求完整评论页，限流和瞬时错误会退避重试
+        :return: (页面内容, 失败时的状态码)；连接错误、超时或重试后仍是可重试状态码时状态码为 None
+        """
+        try:
+            response = self.policy.get(self.session, href, timeout=20)
+            if response.status_code != 200:
+                print(f"请求失败，状态码: {response.status_code}")
+                if response.status_code in self.policy.retry_statuses:
+                    return None, None
+                return None, response.status_code
+            return response.text, None
+        except Exception as e:
+            print(f"提取评论时出错: {str(e)}")
+            return None, None
+
+    def flush_pending(self):
+        """等待已提交的完整评论请求，按页、按原顺序保存评论与日期"""
+        for page, batch in self._pending:
+            for key, item, future in batch:
+                self._pending_keys.discard(key)
+                if future is not None:
+                    content, status = future.result()
+                    if content is None:
+                        metrics.inc('crawler_errors_total', site='qunar', stage='detail')
+                        if status is None:
+                            self.detail_failures += 1
+                        else:
+                            # 评论已删除等不可重试的错误，以后不再请求，也不阻挡游标
+                            self.drop_comment(key, f'http_{status}')
                         continue
-                    sub_soup = BeautifulSoup(response.text, 'html.parser')
-                    text_div = sub_soup.find("div", attrs={"class": "comment_content"})
-                    if text_div:
-                        text = text_div.text.strip()
-                        self.comments.append(text)
-                    else:
-                        print("未找到评论内容")
+                    try:
+                        with metrics.timer('crawler_parse_seconds', site='qunar', page='full_comment'):
+                            text = self.parser.full_comment_text(self.parser.parse(content))
+                    except Exception as e:
+                        print(f"提取评论时出错: {str(e)}")
+                        metrics.inc('crawler_errors_total', site='qunar', stage='parse')
                         continue
                 else:
-                    text_div = comment.find("div", attrs={"class": "e_comment_content"})
-                    if text_div:
-                        text = text_div.text.strip()
-                        self.comments.append(text)
-                    else:
-                        print("未找到评论内容")
-                        continue
-            except Exception as e:
-                print(f"提取评论时出错: {str(e)}")
-                continue
-            try:
-                # 提取日期
-                add_info = comment.find("div", attrs={"class": "e_comment_add_info"})
-                if add_info:
-                    lis = add_info.find_all("li")
-                    if lis:
-                        date = lis[0].text.strip()
+                    text = item['text']
+                if text is None:
+                    print("未找到评论内容")
+                    continue
+                date = "未知日期"
+                try:
+                    # 提取日期
+                    date_text = item['date']
+                    if date_text is not None:
+                        date = date_text
                         pattern = r'\d{4}-\d{2}-\d{2}'  # 匹配 YYYY-MM-DD 格式
                         match = re.search(pattern, date)
                         if match:
                             date = match.group()  # 提取匹配的日期字符串
-                        self.dates.append(date)
-                    else:
-                        self.dates.append("未知日期")
-                else:
-                    self.dates.append("未知日期")
-            except Exception as e:
-                print(f"提取日期时出错: {str(e)}")
-                self.dates.append("未知日期")
-            print(text[:20], date)
+                except Exception as e:
+                    print(f"提取日期时出错: {str(e)}")
+                if not self.dedup.add_text(text):
+                    self.drop_comment(key, 'near_duplicate')
+                    metrics.inc('crawler_duplicates_total', site='qunar', kind='near')
+                    continue
+                self.comments.append(text)
+                self.dates.append(date)
+                # 即时落盘，进程中断也不会丢失
+                self.state.add_record(self.record_kind, key, {'comment': text, 'date': date})
+                metrics.inc('crawler_items_total', site='qunar')
+                print(text[:20], date)
+            # 有评论未取到时不再推进游标，避免续爬时跳过这些页
+            if page is not None and not self.detail_failures:
+                self.state.set_cursor(self.page_cursor, page)
+        self._pending = []
+
+    def drop_comment(self, key, reason):
+        """记录放弃的评论键（近似重复、完整评论页已不存在等），之后的运行直接跳过"""
+        self.state.add_record(self.dropped_kind, key, {'reason': reason})
+
+    def open_sinks(self, csv_path, schema, source):
+        """按 self.formats 打开输出，Parquet 按景点和评论日期分区；写出的是全量评论，该景点的分区整体替换"""
+        return open_sinks(csv_path, schema, source, formats=self.formats, date_field='date',
+                          partitions={'attraction': self.attraction_name}, replace=True)
+
+    def comment_chunks(self, chunksize=10000):
+        """从爬取状态库分块读取已保存的评论"""
+        for records in self.state.iter_records(self.record_kind, chunksize):
+            yield pd.DataFrame(records, columns=['comment', 'date'])
+
+    def analyze_stream(self, chunksize=10000):
+        """流式分析状态库中的全部评论"""
+        nlp_cache = NlpCache()
+        analyze_comment_stream(self.comment_chunks(chunksize), self.attraction_name, cache=nlp_cache,
+                               formats=self.formats)
+        nlp_cache.close()
+        self.session.cache.print_stats()
+        nlp_cache.print_stats()
+
+    def run(self, stream=False, metrics_format='json', profile_path=None):
+        """
+        主运行函数
+        :param stream: 为 True 时分块分析评论，适合大规模评论集
+        :param metrics_format: 运行指标的输出格式，'json' 或 'prom'
+        :param profile_path: 提供时用 cProfile 记录本次运行并保存到该路径
+        """
+        with profiled(profile_path):
+            self._run(stream)
+        metrics.write_run('qunar', metrics_format)
 
-    def run(self):
-        """主运行函数"""
+    def _run(self, stream):
         # 数据抓取
         print("开始抓取评论数据...")
-        df = self.scrape_qunar_comments()
-        print(f"成功抓取 {len(df)} 条评论")
+        df = self.scrape_qunar_comments(stream=stream)
+        total = self.state.count(self.record_kind) if stream else len(df)
+        print(f"成功抓取 {total} 条评论")
 
-        if df.empty:
+        if total == 0:
             print("未获取到评论数据，程序终止")
-            self.driver.quit()
+            self.close()
             return
 
+        if stream:
+            self.analyze_stream()
+        else:
+            self.analyze(df)
+        # 关闭浏览器
+        self.close()
+
+    def analyze(self, df):
+        """预处理、情感分析并生成图表"""
+        # 分词与情感结果按评论内容缓存，之前运行处理过的评论不再计算
+        nlp_cache = NlpCache()
         # 数据预处理
         print("进行数据预处理...")
-        df = preprocess_comments(df)
+        df = preprocess_comments(df, cache=nlp_cache)
 
         # 情感分析
         print("进行情感分析...")
-        df = sentiment_analysis(df)
+        df = sentiment_analysis(df, cache=nlp_cache)
+        nlp_cache.close()
 
         # 确保结果目录存在
         os.makedirs('result', exist_ok=True)
 
         processed_path = f'result/{self.attraction_name}_comments_processed.csv'
-        df.to_csv(processed_path, index=False, encoding='utf-8-sig')
+        with self.open_sinks(processed_path, PROCESSED_COLUMNS, 'qunar_processed') as sink:
+            sink.write(df.to_dict('records'))
         print(f"处理后的数据已保存到 {processed_path}")
 
         # 可视化
         print("生成可视化图表...")
-        generate_visualizations(df, self.attraction_name)
-        print("可视化图表已保存为PNG文件")
-        # 关闭浏览器
-        self.driver.quit()
+        with metrics.timer('analysis_seconds', stage='charts'):
+            generate_visualizations(df, self.attraction_name)
+        self.session.cache.print_stats()
+        nlp_cache.print_stats()
+
+    def close(self):
+        """关闭自有浏览器、请求线程池、爬取状态库和去重索引"""
+        if self.owns_driver:
+            self.driver.quit()
+        self.detail_pool.shutdown(cancel_futures=True)
+        self.state.close()
+        self.dedup.print_stats()
+        self.dedup.close()
+
+
+def run_attractions(attractions, browsers=2, formats=('csv',), nlp_workers=None, metrics_format='json'):
+    """
+    多个景点共用浏览器池并行爬取与分析，抓取完成即归还浏览器，分析与其他景点的抓取重叠进行
+    :param attractions: [{'name': 景点名称, 'url': 景点URL, 'pages': 页数}, ...]
+    :param browsers: 同时使用的浏览器数
+    :param formats: 输出格式，见 QuNaRCrawler
+    :param nlp_workers: 分析共用的进程池大小，见 shared_workers
+    :param metrics_format: 运行指标的输出格式，None 时不写出（由调用方统一写出）
+    :return: 每个景点的 TargetRun.row，单个景点失败不影响其他景点
+    """
+    pool = DriverPool(create_browser, size=browsers)
+
+    def run_one(attraction):
+        crawler = None
+        with TargetRun(attraction['name']) as run:
+            try:
+                with run.stage('crawl'), pool.lease() as driver:
+                    crawler = QuNaRCrawler(attraction['name'], attraction['url'], driver=driver, formats=formats)
+                    try:
+                        df = crawler.scrape_qunar_comments(pages=attraction.get('pages', 20))
+                    finally:
+                        pool.mark_pages(driver, crawler.pages_crawled)
+                run.row['items'] = len(df)
+                if df.empty:
+                    run.row['status'] = 'empty'
+                else:
+                    with run.stage('analyze'):
+                        crawler.analyze(df)
+            finally:
+                if crawler is not None:
+                    crawler.close()
+        return run.row
+
+    try:
+        # 各景点的分析共用一个预热过的进程池；线程数多于浏览器数，借不到浏览器的线程等待，已抓完的线程继续做分析
+        with shared_workers(nlp_workers), ThreadPoolExecutor(max_workers=browsers * 2) as executor:
+            return list(executor.map(run_one, attractions))
+    finally:
+        pool.close()
+        if metrics_format is not None:
+            metrics.write_run('qunar', metrics_format)
 
 
 if __name__ == "__main__":
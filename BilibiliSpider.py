@@ -1,62 +1,176 @@
-import random
 import time
-import csv
-from selenium import webdriver
-from selenium.common import TimeoutException
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from fake_useragent import UserAgent
+import html
+import hashlib
+from functools import reduce
+from urllib.parse import urlencode
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from driver_pool import DriverPool
+from waits import RateLimiter, wait_for_document_ready, wait_for_dom_quiet
+from sinks import open_sinks, parse_count
+from fetch_policy import FetchPolicy, RETRY_STATUSES
+from metrics import TargetRun, metrics
+from dedup import DedupIndex
+from user_agents import random_user_agent
 import re
-
-# 初始化 UserAgent，限制为常见桌面浏览器
-desktop_browsers = ['chrome', 'firefox', 'safari', 'edge', 'opera']
-ua = UserAgent(browsers=desktop_browsers)
+# selenium 只在 dom 模式用到时导入，接口模式不需要加载
 
 
 def get_pc_user_agent():
-    while True:
-        user_agent = ua.random
-        # 正则过滤移动端关键词（忽略大小写）
-        if not re.search(r'Mobile|Android|iPhone|iPad|Windows Phone', user_agent, re.IGNORECASE):
-            return user_agent
+    """从本地缓存的 User-Agent 池中取一个常见桌面浏览器的 UA"""
+    return random_user_agent(desktop=True)
+
+
+# 搜索结果页，直接按 URL 参数翻页；o 为结果偏移量
+SEARCH_PAGE_URL = "https://search.bilibili.com/video"
+# 显示浏览器窗口时等待扫码登录的默认秒数，与原先固定等待的时长相同
+LOGIN_TIMEOUT = 20
+VIDEOS_PER_PAGE = 30
+# 搜索结果列表及其中的视频卡片
+VIDEO_LIST_CSS = 'div.video-list'
+VIDEO_CARD_XPATH = '//div[@class="video-list row"]/div'
+# 输出列及类型
+VIDEO_COLUMNS = [("title", 'string'), ("link", 'string'), ("up", 'string'),
+                 ("play_count", 'int'), ("comments_count", 'int')]
+
+# 卡片内各字段的相对 XPath
+CARD_FIELDS_XPATH = {
+    "title": './/h3[@class="bili-video-card__info--tit"]',
+    "link": './/div[@class="bili-video-card__info--right"]/a',
+    "up": './/span[@class="bili-video-card__info--author"]',
+    "play_count": './/span[@class="bili-video-card__stats--item"][1]/span',
+    "comments_count": './/span[@class="bili-video-card__stats--item"][2]/span',
+}
+
+# 在浏览器内一次性提取整页卡片，XPath 与逐字段 find_element 时相同
+VIDEO_CARDS_JS = """
+const first = (path, ctx) => document.evaluate(path, ctx, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+const text = node => node ? node.innerText.trim() : null;
+const cards = document.evaluate(arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+const result = [];
+for (let i = 0; i < cards.snapshotLength; i++) {
+    const card = cards.snapshotItem(i);
+    const link = first('.//div[@class="bili-video-card__info--right"]/a', card);
+    result.push({
+        title: text(first('.//h3[@class="bili-video-card__info--tit"]', card)),
+        link: link ? link.href : null,
+        up: text(first('.//span[@class="bili-video-card__info--author"]', card)),
+        play_count: text(first('.//span[@class="bili-video-card__stats--item"][1]/span', card)),
+        comments_count: text(first('.//span[@class="bili-video-card__stats--item"][2]/span', card)),
+    });
+}
+return result;
+"""
+
+# 搜索接口与 WBI 签名所需的混淆表
+SEARCH_API = "https://api.bilibili.com/x/web-interface/wbi/search/type"
+NAV_API = "https://api.bilibili.com/x/web-interface/nav"
+MIXIN_KEY_ENC_TAB = [
+    46, 47, 18, 2, 53, 8, 23, 32, 15, 50, 10, 31, 58, 3, 45, 35, 27, 43, 5, 49,
+    33, 9, 42, 19, 29, 28, 14, 39, 12, 38, 41, 13, 37, 48, 7, 16, 24, 55, 40,
+    61, 26, 17, 0, 1, 60, 51, 30, 4, 22, 25, 54, 21, 56, 59, 6, 63, 57, 62, 11,
+    36, 20, 34, 44, 52
+]
+
+
+def sign_wbi(params, img_key, sub_key):
+    """为接口参数添加 wts 与 w_rid 签名"""
+    mixin_key = reduce(lambda key, i: key + (img_key + sub_key)[i], MIXIN_KEY_ENC_TAB, '')[:32]
+    params = dict(params, wts=round(time.time()))
+    params = {k: ''.join(ch for ch in str(v) if ch not in "!'()*") for k, v in sorted(params.items())}
+    params['w_rid'] = hashlib.md5((urlencode(params) + mixin_key).encode()).hexdigest()
+    return params
+
+
+def search_url(keyword, page):
+    """搜索结果第 page 页的地址"""
+    params = {'keyword': keyword, 'page': page}
+    if page > 1:
+        params['o'] = (page - 1) * VIDEOS_PER_PAGE
+    return f"{SEARCH_PAGE_URL}?{urlencode(params)}"
+
+
+def create_browser(headless=True):
+    """初始化浏览器配置"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    # options = webdriver.EdgeOptions()
+    options = webdriver.ChromeOptions()
+    options.add_argument(f'--user-agent={get_pc_user_agent()}')
+    if headless:
+        options.add_argument('--headless')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--disable-application-cache')
+    options.add_argument('--disable-cache')
+    options.add_argument('--disk-cache-size=0')
+    # service = Service(executable_path='../msedgedriver.exe')
+    service = Service(executable_path='../chromedriver.exe')
+    # driver = webdriver.Edge(service=service, options=options)
+    driver = webdriver.Chrome(service=service, options=options)
+    driver.implicitly_wait(5)
+    return driver
 
 
 class BilibiliCrawler:
-    def __init__(self, keyword, max_pages=10, headless=True):
+    def __init__(self, keyword, max_pages=10, headless=True, driver=None, mode='dom', page_interval=1.0,
+                 extraction='js', dedup_path=None, login_timeout=None):
+        """
+        :param headless: 无头模式；传入 driver 时只用于决定是否等待扫码登录
+        :param mode: 'dom' 在浏览器中按 URL 逐页打开搜索结果，提取整页卡片；'api' 直接请求搜索接口的 JSON，无需浏览器
+        :param page_interval: dom 模式下两次翻页的最小间隔（秒）；api 模式下为初始请求间隔，之后按响应自适应
+        :param extraction: dom 模式下 'js' 一次脚本调用取整页字段；'element' 逐卡片 find_element
+        :param dedup_path: 去重索引的 SQLite 路径，为 None 时只在本次运行内按 BV 号去重；
+                           指定路径时跨运行去重，只保存之前没抓到过的视频
+        :param login_timeout: 未登录时等待扫码登录的最长秒数，0 表示直接以游客身份继续；
+                              默认无头模式为 0（无法扫码），显示窗口时为 LOGIN_TIMEOUT
+        """
         self.keyword = keyword  # 搜索关键词
         self.max_pages = max_pages  # 最大爬取页数
+        self.mode = mode
+        self.extraction = extraction
         self.data = []  # 存储爬取数据
-        # 初始化浏览器
-        self.driver = self._init_browser(headless)
-        self.wait = WebDriverWait(self.driver, 15)
+        self.dedup_path = dedup_path
+        self.dedup = DedupIndex(dedup_path, namespace=f'bilibili:{keyword}')
+        self.seen = set()  # 本次运行已出现过的 BV 号，用于发现结果开始重复
+        self.pages_crawled = 0  # 已加载的结果页数
+        self.login_timeout = (0 if headless else LOGIN_TIMEOUT) if login_timeout is None else login_timeout
+        # 初始化浏览器，传入 driver 时复用浏览器池中的实例，由池负责关闭
+        # 接口模式只在传入 driver 时借用其登录 Cookie
+        self.owns_driver = driver is None and mode == 'dom'
+        self.driver = driver or (self._init_browser(headless) if mode == 'dom' else None)
+        self.session = None
+        self.limiter = RateLimiter(page_interval)
+        # 接口模式的限速与重试策略：初始每 page_interval 秒一次请求，412 为B站风控拦截
+        rate = 1 / page_interval if page_interval else None
+        self.policy = FetchPolicy(rate=rate, max_rate=2 * (rate or 0), retry_statuses=RETRY_STATUSES + (412,))
 
     def _init_browser(self, headless):
         """初始化浏览器配置"""
-        # options = webdriver.EdgeOptions()
-        options = webdriver.ChromeOptions()
-        options.add_argument(f'--user-agent={get_pc_user_agent()}')
-        if headless:
-            options.add_argument('--headless')
-        options.add_argument('--disable-gpu')
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--disable-application-cache')
-        options.add_argument('--disable-cache')
-        options.add_argument('--disk-cache-size=0')
-        # service = Service(executable_path='../msedgedriver.exe')
-        service = Service(executable_path='../chromedriver.exe')
-        # driver = webdriver.Edge(service=service, options=options)
-        driver = webdriver.Chrome(service=service, options=options)
-        driver.implicitly_wait(5)
-        return driver
+        return create_browser(headless)
 
     def __del__(self):
         """析构函数：关闭浏览器"""
-        self.driver.quit()
+        if self.owns_driver:
+            self.driver.quit()
+        if self.session is not None:
+            self.session.close()
+        self.dedup.close()
 
     def login(self):
+        from selenium.common import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        # 复用的浏览器已登录时跳过
+        if self.driver.get_cookie('SESSDATA'):
+            return
+        if not self.login_timeout:
+            print("未登录，以游客身份继续")
+            return
 
         login_button = WebDriverWait(self.driver, 30).until(
             EC.element_to_be_clickable((By.XPATH, '//div[@class="header-login-entry"]'))
@@ -70,127 +184,260 @@ class BilibiliCrawler:
         # inputs[0].send_keys(self.account)
         # inputs[1].send_keys(self.password)
         # login_item.find_element(By.XPATH, '//div[@class="btn_primary "]').click()
-        time.sleep(20)
-
-    def search_keyword(self):
-        """访问首页并执行搜索操作"""
-        print(f"正在抓取{self.keyword}关键字内容")
-        # 记录当前窗口句柄
-        current_handles = self.driver.window_handles
-        # 定位搜索框并输入关键词（XPath）
-        search_box = WebDriverWait(self.driver, 10).until(
-            EC.presence_of_element_located((By.XPATH, '//input[@class="nav-search-input"]'))
-        )
-        search_box.send_keys(self.keyword)
-
-        # 点击搜索按钮（XPath）
-        search_button = WebDriverWait(self.driver, 10).until(
-            EC.element_to_be_clickable((By.XPATH, '//div[@class="nav-search-btn"]'))
-        )
-        search_button.click()
-        time.sleep(random.uniform(1, 3))
-        # 等待新标签页打开
+        # 等待扫码登录完成（出现登录 Cookie），最多 login_timeout 秒
         try:
-            WebDriverWait(self.driver, 10).until(
-                lambda d: len(d.window_handles) > len(current_handles)
-            )
+            WebDriverWait(self.driver, self.login_timeout, poll_frequency=1).until(lambda d: d.get_cookie('SESSDATA'))
         except TimeoutException:
-            print("错误：新标签页未打开")
-            self.driver.save_screenshot("error_new_tab.png")
-            return
-
-        # 切换到新标签页
-        new_handles = self.driver.window_handles
-        new_tab_handle = [handle for handle in new_handles if handle not in current_handles][0]
-        self.driver.switch_to.window(new_tab_handle)
-        print("已切换到新标签页，URL:", self.driver.current_url)
+            print("未检测到登录，以游客身份继续")
 
     def extract_video_info(self):
-        """提取当前页面的视频信息"""
-        # print("正在加载视频列表")
-        time.sleep(random.uniform(5, 10))
-        # 等待视频列表加载完成（XPath）
-        # WebDriverWait(self.driver, 10).until(
-        #     EC.presence_of_element_located((By.XPATH, '//div[@class="video-list row"]'))
-        # )
-        # 定位所有视频块（XPath）
-        video_items = self.driver.find_elements(By.XPATH, '//div[@class="bili-video-card"]')
-        video_items_xpath = '//div[@class="video-list row"]/div[1]'
-        # 提取第一个视频的信息
-        try:
-            # 标题（XPath）
-            title = self.driver.find_element(By.XPATH,
-                                             f'{video_items_xpath}//h3[@class="bili-video-card__info--tit"]').text.strip()
-            # 链接（XPath）
-            link = self.driver.find_element(By.XPATH,
-                                            f'{video_items_xpath}//div[@class="bili-video-card__info--right"]/a').get_attribute(
-                "href")
-            # UP主（XPath）
-            up = self.driver.find_element(By.XPATH,
-                                          f'{video_items_xpath}//span[@class="bili-video-card__info--author"]').text.strip()
-
-            # 播放量（XPath）
-            play_count = self.driver.find_element(By.XPATH,
-                                                  f'{video_items_xpath}//span[@class="bili-video-card__stats--item"][1]/span').text.strip()
-            # 评论量
-            comments_count = self.driver.find_element(By.XPATH,
-                                                      f'{video_items_xpath}//span[@class="bili-video-card__stats--item"][2]/span').text.strip()
-            print({
-                "title": title,
-                "link": link,
-                "up": up,
-                "play_count": play_count,
-                "comments_count": comments_count
-            })
-            self.data.append({
-                "title": title,
-                "link": link,
-                "up": up,
-                "play_count": play_count,
-                "comments_count": comments_count
-            })
-        except Exception as e:
-            print(f"提取数据失败: {e}")
-
-    def switch_to_next_page(self):
-        """切换到下一页（XPath）"""
+        """提取当前页面的全部视频，返回带类型的记录列表"""
+        from selenium.common import TimeoutException
+
+        # 等待视频列表出现且不再变化
         try:
-            next_button = self.driver.find_elements(By.XPATH,
-                                                   '//button[@class="vui_button vui_pagenation--btn vui_pagenation--btn-side"]')
-            if len(next_button) > 1:
-                next_button[1].click()
+            wait_for_dom_quiet(self.driver, VIDEO_LIST_CSS)
+        except TimeoutException:
+            print("视频列表加载超时")
+        with metrics.timer('crawler_parse_seconds', site='bilibili', page=self.extraction):
+            if self.extraction == 'js':
+                cards = self.driver.execute_script(VIDEO_CARDS_JS, VIDEO_CARD_XPATH) or []
             else:
-                next_button[0].click()
-            time.sleep(random.uniform(3, 5))  # 等待页面加载
-            return True
-        except Exception as e:
-            return False
+                cards = self.extract_cards_elements()
+            # 广告、直播等卡片缺少统计项，跳过
+            videos = [self.parse_card(card) for card in cards if None not in card.values()]
+        if cards and not videos:
+            print("提取数据失败: 未找到完整的视频卡片")
+            metrics.inc('crawler_errors_total', site='bilibili', stage='parse')
+        return videos
+
+    def extract_cards_elements(self):
+        """逐卡片 find_element 提取字段，结果与 VIDEO_CARDS_JS 相同"""
+        from selenium.common import NoSuchElementException
+        from selenium.webdriver.common.by import By
+
+        cards = []
+        for item in self.driver.find_elements(By.XPATH, VIDEO_CARD_XPATH):
+            card = {}
+            for field, xpath in CARD_FIELDS_XPATH.items():
+                try:
+                    element = item.find_element(By.XPATH, xpath)
+                except NoSuchElementException:
+                    card[field] = None
+                    continue
+                card[field] = element.get_attribute("href") if field == "link" else element.text.strip()
+            cards.append(card)
+        return cards
+
+    @staticmethod
+    def parse_card(card):
+        """页面卡片转为带类型的记录，播放量、评论数如“1.2万”转为整数"""
+        return {
+            "title": card["title"],
+            "link": card["link"],
+            "up": card["up"],
+            "play_count": parse_count(card["play_count"]),
+            "comments_count": parse_count(card["comments_count"]),
+        }
+
+    @staticmethod
+    def video_key(video):
+        """去重键：链接中的 BV 号，取不到时用整个链接"""
+        link = video.get('link') or ''
+        match = re.search(r'BV[0-9A-Za-z]{10}', link)
+        return match.group(0) if match else link.split('?')[0]
+
+    def add_videos(self, videos):
+        """按 BV 号去重后加入 data，返回新增的条数"""
+        added = 0
+        for video in videos:
+            if not self.dedup.add_key(self.video_key(video)):
+                metrics.inc('crawler_duplicates_total', site='bilibili', kind='exact')
+                continue
+            self.data.append(video)
+            added += 1
+        metrics.inc('crawler_items_total', added, site='bilibili')
+        return added
+
+    def add_page(self, page, videos):
+        """
+        保存一页结果
+        :return: 本页是否有本次运行尚未出现过的视频；没有说明已超出结果范围，B站在重复返回之前的结果
+        """
+        keys = {self.video_key(video) for video in videos}
+        fresh = keys - self.seen
+        self.seen |= keys
+        added = self.add_videos(videos)
+        self.pages_crawled += 1
+        print(f"已抓取第 {page} 页，共 {len(videos)} 个视频，新增 {added} 个")
+        return bool(fresh)
+
+    def _init_session(self):
+        """创建接口会话：沿用浏览器的 Cookie，没有浏览器时访问首页获取游客 Cookie"""
+        session = requests.Session()
+        session.headers.update({
+            'User-Agent': get_pc_user_agent(),
+            'Referer': 'https://www.bilibili.com/',
+        })
+        if self.driver is not None:
+            for cookie in self.driver.get_cookies():
+                session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'))
+        if not session.cookies:
+            session.get("https://www.bilibili.com/", timeout=10)
+        return session
+
+    def _wbi_keys(self):
+        """从导航接口获取 WBI 签名密钥"""
+        wbi_img = self.policy.get(self.session, NAV_API, timeout=10).json()['data']['wbi_img']
+        img_key = wbi_img['img_url'].rsplit('/', 1)[1].split('.')[0]
+        sub_key = wbi_img['sub_url'].rsplit('/', 1)[1].split('.')[0]
+        return img_key, sub_key
+
+    @staticmethod
+    def parse_api_item(item):
+        """接口结果转换为与页面卡片相同的记录格式"""
+        return {
+            "title": html.unescape(re.sub(r'<[^>]+>', '', item.get('title', ''))),
+            "link": f"https://www.bilibili.com/video/{item['bvid']}/" if item.get('bvid') else item.get('arcurl'),
+            "up": item.get('author', ''),
+            "play_count": item.get('play', 0),
+            # 与卡片第二个统计项一致
+            "comments_count": item.get('video_review', 0),
+        }
+
+    def crawl_api(self):
+        """直接请求搜索接口，每页一次请求取得全部视频"""
+        print(f"正在通过接口抓取{self.keyword}关键字内容")
+        self.session = self._init_session()
+        img_key, sub_key = self._wbi_keys()
+        for page in range(1, self.max_pages + 1):
+            params = sign_wbi({'search_type': 'video', 'keyword': self.keyword, 'page': page}, img_key, sub_key)
+            try:
+                response = self.policy.get(self.session, SEARCH_API, params=params, timeout=10)
+                response.raise_for_status()
+                payload = response.json()
+            except Exception as e:
+                print(f"请求第 {page} 页失败: {e}")
+                metrics.inc('crawler_errors_total', site='bilibili', stage='api')
+                break
+            if payload.get('code') != 0:
+                print(f"接口返回错误: {payload.get('code')} {payload.get('message')}")
+                metrics.inc('crawler_errors_total', site='bilibili', stage='api')
+                break
+            results = payload['data'].get('result') or []
+            with metrics.timer('crawler_parse_seconds', site='bilibili', page='api'):
+                videos = [self.parse_api_item(item) for item in results if item.get('type') == 'video']
+            if not self.add_page(page, videos):
+                print("结果开始重复，停止翻页")
+                break
+            if page >= payload['data'].get('numPages', 0):
+                print("已到达最后一页")
+                break
+        self.policy.print_stats()
+        self.dedup.print_stats()
 
     def crawl(self):
         """执行爬取流程"""
+        if self.mode == 'api':
+            self.crawl_api()
+            return
         self.driver.get("https://www.bilibili.com/")
-        time.sleep(random.uniform(1.5, 3))
+        wait_for_document_ready(self.driver)
         self.login()
 
-        self.search_keyword()
-
-        current_page = 1
-        while current_page <= self.max_pages:
-            print(f"正在爬取第 {current_page} 页...")
-            self.extract_video_info()
-
-            if not self.switch_to_next_page():
-                print("已到达最后一页")
+        print(f"正在抓取{self.keyword}关键字内容")
+        for page in range(1, self.max_pages + 1):
+            if page > 1:
+                self.limiter.wait()  # 防止请求过快
+            self.driver.get(search_url(self.keyword, page))
+            videos = self.extract_video_info()
+            if not videos:
+                print("没有更多结果，已到达最后一页")
+                break
+            if not self.add_page(page, videos):
+                print("结果开始重复，停止翻页")
                 break
-            current_page += 1
+        self.dedup.print_stats()
 
     def save_to_csv(self, filename="bilibili_videos.csv"):
         """保存数据到 CSV 文件"""
-        with open(filename, "w", newline="", encoding="utf-8-sig") as f:
-            writer = csv.DictWriter(f, fieldnames=["title", "link", "up", "play_count", "comments_count"])
-            writer.writeheader()
-            writer.writerows(self.data)
-        print(f"数据已保存至 {filename}")
+        self.save(filename)
+
+    def save(self, filename="bilibili_videos.csv", formats=('csv',)):
+        """
+        保存数据；跨运行去重时 data 只有本次新抓到的视频，追加到已有文件，
+        否则 data 是该关键词的全部结果，替换 Parquet 中该关键词的分区
+        :param formats: 'csv'、'parquet' 的任意组合，Parquet 中播放量和评论数为整数列
+        """
+        incremental = self.dedup_path is not None
+        with open_sinks(filename, VIDEO_COLUMNS, 'bilibili', formats=formats, partitions={'keyword': self.keyword},
+                        append=incremental, replace=not incremental) as sink:
+            sink.write(self.data)
+        print(f"数据已保存至 {filename}" if 'csv' in formats else "数据已保存至 Parquet 数据集")
+
+
+def crawl_targets(targets, browsers=2, headless=True, formats=('csv',), metrics_format='json'):
+    """
+    多个关键词并行爬取，dom 模式共用浏览器池，api 模式不占用浏览器；每个关键词单独保存
+    :param targets: [{'keyword': 关键词, 'max_pages': 页数, 'mode': 'dom' 或 'api', 'dedup_path': 跨运行去重索引}, ...]
+    :param browsers: 同时使用的浏览器数（也是并行爬取的关键词数）
+    :param formats: 输出格式，见 BilibiliCrawler.save
+    :param metrics_format: 运行指标的输出格式，None 时不写出（由调用方统一写出）
+    :return: 每个关键词的 TargetRun.row，单个关键词失败不影响其他关键词
+    """
+    needs_browser = any(target.get('mode', 'dom') == 'dom' for target in targets)
+    pool = DriverPool(lambda: create_browser(headless), size=browsers) if needs_browser else None
+
+    def crawl(target, driver=None):
+        crawler = BilibiliCrawler(target['keyword'], max_pages=target.get('max_pages', 10), headless=headless,
+                                  driver=driver, mode=target.get('mode', 'dom'),
+                                  dedup_path=target.get('dedup_path'))
+        try:
+            crawler.crawl()
+        finally:
+            if driver is not None:
+                pool.mark_pages(driver, crawler.pages_crawled)
+        return crawler
+
+    def crawl_one(target):
+        with TargetRun(target['keyword']) as run:
+            with run.stage('crawl'):
+                if target.get('mode', 'dom') == 'api':
+                    crawler = crawl(target)
+                else:
+                    with pool.lease() as driver:
+                        crawler = crawl(target, driver)
+            run.row['items'] = len(crawler.data)
+            if crawler.data:
+                crawler.save(f"bilibili_{target['keyword']}_videos.csv", formats=formats)
+            else:
+                run.row['status'] = 'empty'
+        return run.row
+
+    try:
+        with ThreadPoolExecutor(max_workers=browsers) as executor:
+            return list(executor.map(crawl_one, targets))
+    finally:
+        if pool is not None:
+            pool.close()
+        if metrics_format is not None:
+            metrics.write_run('bilibili', metrics_format)
+
+
+def crawl_keywords(keywords, max_pages=10, headless=True, browsers=2, mode='dom', formats=('csv',),
+                   metrics_format='json', dedup_path=None):
+    """
+    用相同参数爬取多个关键词，见 crawl_targets
+    :param keywords: 关键词列表
+    :param mode: 'dom' 或 'api'，见 BilibiliCrawler
+    :param dedup_path: 跨运行去重索引的路径，见 BilibiliCrawler；提供时结果追加到已有文件
+    :return: {关键词: 视频数}
+    """
+    targets = [{'keyword': keyword, 'max_pages': max_pages, 'mode': mode, 'dedup_path': dedup_path}
+               for keyword in keywords]
+    rows = crawl_targets(targets, browsers=browsers, headless=headless, formats=formats,
+                         metrics_format=metrics_format)
+    return {row['target']: row['items'] for row in rows}
 
 
 if __name__ == "__main__":
@@ -198,3 +445,4 @@ if __name__ == "__main__":
     crawler = BilibiliCrawler(keyword="Python", max_pages=10, headless=False)
     crawler.crawl()
     crawler.save_to_csv()
+    metrics.write_run('bilibili')
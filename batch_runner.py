@@ -0,0 +1,82 @@
+"""
+批量任务入口：按清单爬取多个去哪儿景点和B站关键词
+- 同一站点的目标共用一个浏览器池，同时借出的浏览器数不超过 browsers
+- 景点评论的分词与情感分析共用一个预热过的进程池，模型每个进程只加载一次
+- 每个目标单独输出结果文件，最后写出包含各目标耗时的汇总表
+
+清单示例（JSON）：
+{
+    "browsers": 2,
+    "nlp_workers": 4,
+    "formats": ["csv", "parquet"],
+    "qunar": [{"name": "杭州西湖", "url": "https://travel.qunar.com/p-oi708952-xihufengjingmingsheng", "pages": 20}],
+    "bilibili": [{"keyword": "Python", "max_pages": 10, "mode": "api", "dedup_path": "cache/dedup.sqlite"}]
+}
+用法：python batch_runner.py manifest.json
+"""
+import argparse
+import json
+import os
+import time
+
+from metrics import metrics
+from sinks import CsvSink
+
+SUMMARY_FIELDS = ['type', 'target', 'status', 'items', 'crawl_seconds', 'analyze_seconds', 'total_seconds', 'error']
+
+
+def load_manifest(path):
+    """读取 JSON 清单"""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _rows(kind, results):
+    """在各目标的 TargetRun.row 前加上站点类型"""
+    return [{'type': kind, **row} for row in results]
+
+
+def run_batch(manifest, summary_path=None):
+    """
+    按清单依次运行各站点的目标，写出汇总表
+    :param manifest: load_manifest 的返回值
+    :param summary_path: 汇总CSV路径，默认 result/batch_summary_YYYYMMDD_HHMMSS.csv
+    :return: 汇总行列表
+    """
+    browsers = manifest.get('browsers', 2)
+    formats = tuple(manifest.get('formats', ('csv',)))
+    summary_path = summary_path or f"result/batch_summary_{time.strftime('%Y%m%d_%H%M%S')}.csv"
+    rows = []
+    start = time.perf_counter()
+    if manifest.get('qunar'):
+        from Attractions import run_attractions
+
+        rows += _rows('qunar', run_attractions(manifest['qunar'], browsers=browsers, formats=formats,
+                                               nlp_workers=manifest.get('nlp_workers'), metrics_format=None))
+    if manifest.get('bilibili'):
+        from BilibiliSpider import crawl_targets
+
+        rows += _rows('bilibili', crawl_targets(manifest['bilibili'], browsers=browsers,
+                                                headless=manifest.get('headless', True), formats=formats,
+                                                metrics_format=None))
+
+    os.makedirs(os.path.dirname(summary_path) or '.', exist_ok=True)
+    with CsvSink(summary_path, SUMMARY_FIELDS) as sink:
+        sink.write(rows)
+    failed = sum(row['status'] == 'failed' for row in rows)
+    print(f"共 {len(rows)} 个目标，失败 {failed} 个，总耗时 {time.perf_counter() - start:.1f} 秒")
+    print(f"汇总已保存到 {summary_path}")
+    metrics.write_run('batch', manifest.get('metrics_format', 'json'))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按清单批量爬取景点评论和B站关键词")
+    parser.add_argument('manifest', help="JSON 清单路径")
+    parser.add_argument('--summary', help="汇总CSV路径")
+    args = parser.parse_args()
+    run_batch(load_manifest(args.manifest), summary_path=args.summary)
+
+
+if __name__ == "__main__":
+    main()
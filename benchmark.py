@@ -0,0 +1,598 @@
+"""
+性能基准：在本地桩服务器上对比各阶段的耗时
+用法: python benchmark.py fetch
+      python benchmark.py js
+      python benchmark.py startup --budget 1.0
+      python benchmark.py suite --compare result/bench/上次结果.json
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import platform
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# 模拟上海研究院期刊文章详情页的表格结构
+ARTICLE_HTML = """<html><body>
+<div class="C_right"><div>测试文章标题{id}</div><div>副标题</div></div>
+<table>
+<tr><td>标题</td><td>测试文章标题{id}</td></tr>
+<tr><td>摘要</td><td><p>这是第{id}篇文章的中文摘要。</p></td></tr>
+<tr><td>英文摘要</td><td><p>Abstract of article {id}.</p></td></tr>
+<tr><td>DOI</td><td>10.0000/{id}</td></tr>
+<tr><td>作者</td><td>张三{id}</td></tr>
+<tr><td></td><td></td></tr>
+<tr><td>作者单位</td><td>上海社会科学院</td></tr>
+<tr><td></td><td></td></tr>
+<tr><td>期刊</td><td>上海研究院学报</td></tr>
+<tr><td></td><td></td></tr>
+<tr><td>年·期</td><td>2024·{id}</td></tr>
+<tr><td></td><td></td></tr>
+<tr><td></td><td></td></tr>
+<tr><td></td><td></td></tr>
+<tr><td></td><td></td></tr>
+<tr><td></td><td></td></tr>
+<tr><td>关键词</td><td>城市;社会;{id}</td></tr>
+</table>
+</body></html>"""
+
+DIRECTORY_ROW = '<tr><td><a href="/Magazine/show/?id={id}">文章{id}</a></td></tr>'
+ARTICLES_PER_PAGE = 20
+
+
+def directory_html(page):
+    rows = [DIRECTORY_ROW.format(id=(page - 1) * ARTICLES_PER_PAGE + i) for i in range(ARTICLES_PER_PAGE)]
+    return '<html><body><table><tr><th>标题</th></tr>' + ''.join(rows) + '</table></body></html>'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """按路径返回固定页面，并模拟网络延迟"""
+    delay = 0.05
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        query = parse_qs(urlsplit(self.path).query)
+        if 'PageIndex' in query:
+            body = directory_html(int(query['PageIndex'][0])).encode('utf-8')
+        else:
+            body = ARTICLE_HTML.format(id=query['id'][0]).encode('utf-8')
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(delay=0.05):
+    """在后台线程启动桩服务器，返回 (server, base_url)"""
+    handler = type('Handler', (StubHandler,), {'delay': delay})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def timed(label, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    print(f"{label}: {elapsed:.3f}s")
+    return result, elapsed
+
+
+def use_plain_session(spider):
+    """基准中关闭响应缓存，避免前一轮的结果影响后一轮"""
+    import requests
+
+    spider.session = requests.Session()
+    spider.session.headers.update(spider.request_headers())
+
+
+def use_unthrottled_policy(spider):
+    """串行请求也不限速，与并发一侧的 rate=None 对齐，只比较并发与缓存本身的效果"""
+    from fetch_policy import FetchPolicy
+
+    spider.policy = FetchPolicy(rate=None)
+
+
+def bench_fetch(pages=40, delay=0.05):
+    """串行 parse_article_page 与并发 parse_article_pages 对比"""
+    import spider
+
+    use_plain_session(spider)
+    use_unthrottled_policy(spider)
+    server, base_url = start_stub_server(delay)
+    urls = [f"{base_url}/Magazine/show/?id={i}" for i in range(pages)]
+    try:
+        serial, serial_time = timed("串行", lambda: [spider.parse_article_page(url) for url in urls])
+        concurrent, concurrent_time = timed(
+            "并发", spider.parse_article_pages, urls, concurrency=16, per_host=8, rate=None)
+    finally:
+        server.shutdown()
+    assert serial == concurrent, "并发结果与串行结果不一致"
+    print(f"{pages} 页，加速比 {serial_time / concurrent_time:.1f}x")
+
+
+def bench_pipeline(pages=5, delay=0.05):
+    """先列目录再抓详情的两阶段流程与流水线流程对比首行时间和总耗时"""
+    import requests
+    import spider
+
+    use_plain_session(spider)
+    server, base_url = start_stub_server(delay)
+    spider.BASE_URL = base_url
+    spider.DIRECTORY_URL = base_url + "/Magazine/"
+    try:
+        start = time.perf_counter()
+        links = []
+        for page in range(1, pages + 1):
+            response = requests.get(spider.DIRECTORY_URL, params=spider.directory_params(page), timeout=10)
+            links.extend(spider.parse_directory_html(response.text)[0])
+        listed = time.perf_counter() - start
+        spider.parse_article_pages(links, concurrency=8, per_host=8, rate=None)
+        two_phase = time.perf_counter() - start
+
+        first_row = []
+        start = time.perf_counter()
+        spider.crawl_articles(lambda row: first_row.append(time.perf_counter() - start),
+                              page_count=pages, workers=8, per_host=8, rate=None)
+        pipelined = time.perf_counter() - start
+    finally:
+        server.shutdown()
+    print(f"两阶段: 首行 >{listed:.3f}s, 总计 {two_phase:.3f}s")
+    print(f"流水线: 首行 {first_row[0]:.3f}s, 总计 {pipelined:.3f}s, 共 {len(first_row)} 行")
+
+
+def bench_cache(pages=40, delay=0.05):
+    """冷缓存、过期后条件请求、新鲜缓存三轮对比"""
+    import spider
+    from http_cache import CachedSession, HttpCache
+
+    server, base_url = start_stub_server(delay)
+    urls = [f"{base_url}/Magazine/show/?id={i}" for i in range(pages)]
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = HttpCache(f"{tmp}/http_cache.sqlite")
+        spider.session = CachedSession(cache)
+        use_unthrottled_policy(spider)
+        try:
+            for label, ttl in (("冷缓存", 0), ("条件请求", 3600), ("新鲜缓存", 3600)):
+                cache.ttl = ttl
+                timed(label, lambda: [spider.parse_article_page(url) for url in urls])
+            cache.print_stats()
+        finally:
+            cache.close()
+            server.shutdown()
+
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def bench_parse(repeat=200):
+    """各解析后端在保存的样例页面上的耗时，并校验提取结果一致"""
+    import spider
+    from extractors import BACKENDS, get_backend
+
+    article = load_fixture('ajcass_article.html')
+    directory = load_fixture('ajcass_directory.html')
+    comments = load_fixture('qunar_comments.html')
+    full_comment = load_fixture('qunar_full_comment.html')
+    search = load_fixture('bilibili_search.html')
+
+    def qunar_fields(parser):
+        doc = parser.parse(comments)
+        items = [(parser.see_more_href(item), parser.comment_text(item), parser.comment_date(item))
+                 for item in parser.comment_items(doc)]
+        return items, parser.full_comment_text(parser.parse(full_comment))
+
+    pages = {
+        '文章详情页': lambda name: spider.parse_article_html(article, 'fixture', backend=name),
+        '目录页': lambda name: spider.parse_directory_html(directory, backend=name),
+        '评论页': lambda name: qunar_fields(get_backend(name)),
+        '搜索结果页': lambda name: get_backend(name).video_cards(get_backend(name).parse(search)),
+    }
+    for page, extract in pages.items():
+        outputs = {}
+        for name in BACKENDS:
+            with contextlib.redirect_stdout(io.StringIO()):
+                outputs[name] = extract(name)
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    extract(name)
+                elapsed = time.perf_counter() - start
+            print(f"{page} [{name}]: {elapsed / repeat * 1000:.3f} ms/页")
+        assert len(set(map(repr, outputs.values()))) == 1, f"{page} 各后端提取结果不一致"
+
+
+def start_headless_chrome():
+    """启动无头 Chrome，selenium 或浏览器不可用时返回 None"""
+    try:
+        from selenium import webdriver
+
+        options = webdriver.ChromeOptions()
+        options.add_argument('--headless=new')
+        options.add_argument('--no-sandbox')
+        return webdriver.Chrome(options=options)
+    except Exception as e:
+        print(f"无法启动无头浏览器: {e}")
+        return None
+
+
+def bench_js(repeat=20):
+    """
+    在无头浏览器中打开样例页面，COMMENTS_JS、VIDEO_CARDS_JS 的结果与 bs4/lxml 及逐元素提取比对，并对比耗时
+    没有可用的浏览器时跳过
+    """
+    from urllib.parse import urljoin
+
+    from Attractions import COMMENTS_JS
+    from BilibiliSpider import VIDEO_CARD_XPATH, VIDEO_CARDS_JS, BilibiliCrawler
+    from extractors import BACKENDS, get_backend
+
+    driver = start_headless_chrome()
+    if driver is None:
+        print("没有可用的浏览器，跳过 JS 提取校验")
+        return
+
+    def comment_items(parser, html):
+        return [{'more': parser.see_more_href(item), 'text': parser.comment_text(item),
+                 'date': parser.comment_date(item)} for item in parser.comment_items(parser.parse(html))]
+
+    def video_cards(parser, html):
+        # 浏览器返回的是解析后的绝对链接
+        return [dict(card, link=card['link'] and urljoin(driver.current_url, card['link']))
+                for card in parser.video_cards(parser.parse(html))]
+
+    crawler = BilibiliCrawler('fixture', driver=driver)
+    pages = {
+        '评论页': ('qunar_comments.html', comment_items, {
+            'js': lambda: driver.execute_script(COMMENTS_JS),
+        }),
+        '搜索结果页': ('bilibili_search.html', video_cards, {
+            'js': lambda: driver.execute_script(VIDEO_CARDS_JS, VIDEO_CARD_XPATH),
+            'element': crawler.extract_cards_elements,
+        }),
+    }
+    try:
+        for page, (fixture, parse, extractors) in pages.items():
+            driver.get('file://' + os.path.join(FIXTURE_DIR, fixture))
+            html = load_fixture(fixture)
+            expected = {name: parse(get_backend(name), html) for name in BACKENDS}
+            for extraction, extract in extractors.items():
+                result = extract()
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    extract()
+                print(f"{page} [{extraction}]: {(time.perf_counter() - start) / repeat * 1000:.3f} ms/页，"
+                      f"{len(result)} 条")
+                for name, items in expected.items():
+                    assert result == items, f"{page} {extraction} 与 {name} 的提取结果不一致"
+    finally:
+        driver.quit()
+
+
+def synthetic_comments(count, seed=0):
+    """由常见短语随机拼接的评论，约一成重复"""
+    import random
+
+    phrases = ['西湖的风景真的很美', '人太多了排队很久', '断桥残雪值得一看', '门票不贵性价比高',
+               '早上去空气很好', '停车不方便', '导游讲解很详细', '夜景一般般', '苏堤春晓非常漂亮',
+               '周边吃饭有点贵', '下次还会再来', '服务态度很差']
+    rng = random.Random(seed)
+    unique = ['，'.join(rng.sample(phrases, rng.randint(2, 5))) + f'，第{i}次' for i in range(count * 9 // 10)]
+    return unique + rng.choices(unique, k=count - len(unique))
+
+
+def random_text(rng, length):
+    """随机汉字组成的文本，合成的样例评论之间不会被判为近似重复"""
+    return ''.join(chr(0x4e00 + rng.randrange(0x5000)) for _ in range(length))
+
+
+def bench_sentiment(sizes=(10000, 100000)):
+    """串行逐条打分与进程池分块打分对比，并校验结果逐位一致"""
+    from snownlp import SnowNLP
+    from nlp_engine import score_sentiments
+
+    cores = os.cpu_count() or 1
+    for size in sizes:
+        texts = synthetic_comments(size)
+        serial, serial_time = timed(f"{size} 条 串行", lambda: [SnowNLP(text).sentiments for text in texts])
+        for workers in sorted({1, 2, cores} & set(range(1, cores + 1))):
+            scores, elapsed = timed(f"{size} 条 {workers} 进程",
+                                    score_sentiments, texts, workers=workers, progress=False)
+            assert scores == serial, "并行结果与串行结果不一致"
+            print(f"  加速比 {serial_time / elapsed:.1f}x")
+
+
+def build_fixture_cassettes(directory, qunar_pages=20, bilibili_pages=10):
+    """
+    由样例页面合成各回放目标的录制文件，没有真实录制时供离线基准使用
+    :return: {目标: 录制文件路径}
+    """
+    import random
+
+    import requests
+    import spider
+    from Attractions import COMMENTS_JS
+    from BilibiliSpider import NAV_API, SEARCH_API, VIDEO_CARD_XPATH, VIDEO_CARDS_JS
+    from extractors import get_backend
+    from replay import BILIBILI_SESSION, QUNAR_URL, TARGETS, Cassette, _call_key
+    from selenium.webdriver.common.by import By
+
+    def url_with(url, params):
+        prepared = requests.PreparedRequest()
+        prepared.prepare_url(url, params)
+        return prepared.url
+
+    html_headers = {'Content-Type': 'text/html; charset=utf-8'}
+    json_headers = {'Content-Type': 'application/json; charset=utf-8'}
+    paths = {target: os.path.join(directory, f'{target}.sqlite') for target in TARGETS}
+
+    journal = Cassette(paths['journal'])
+    for page in range(1, 4):
+        journal.put_http('GET', url_with(spider.DIRECTORY_URL, spider.directory_params(page)), 200, html_headers,
+                         directory_html(page).encode('utf-8'))
+        for i in range(ARTICLES_PER_PAGE):
+            article_id = (page - 1) * ARTICLES_PER_PAGE + i
+            journal.put_http('GET', f"{spider.BASE_URL}/Magazine/show/?id={article_id}", 200, html_headers,
+                             ARTICLE_HTML.format(id=article_id).encode('utf-8'))
+    journal.close()
+
+    # 去哪儿：每条评论和完整评论页都改写成不同的随机内容与链接，页面快照按步骤合成
+    qunar = Cassette(paths['qunar'])
+    parser = get_backend()
+    rng = random.Random(0)
+    template = load_fixture('qunar_comments.html')
+    full_template = load_fixture('qunar_full_comment.html')
+    steps = [{'calls': {}}]
+    for page in range(1, qunar_pages + 1):
+        html = re.sub(r'comment-(\d+)', lambda m: f'comment-{page}{m.group(1)}', template)
+        html = re.sub(r'(<div class="e_comment_content"><p>)[^<]*', lambda m: m.group(1) + random_text(rng, 40), html)
+        doc = parser.parse(html)
+        items = [{'more': parser.see_more_href(item), 'text': parser.comment_text(item),
+                  'date': parser.comment_date(item)} for item in parser.comment_items(doc)]
+        for item in items:
+            if item['more']:
+                full_comment = re.sub(r'(<div class="comment_content"><p>)[^<]*',
+                                      lambda m: m.group(1) + random_text(rng, 200), full_template)
+                qunar.put_http('GET', item['more'], 200, html_headers, full_comment.encode('utf-8'))
+        steps.append({'calls': {
+            _call_key('find_elements', By.CLASS_NAME, 'b_comment_box'): 1,
+            _call_key('execute_script', COMMENTS_JS): items,
+            'page_source': html,
+            _call_key('find_elements', By.XPATH, '//a[@class="page next"]'): int(page < qunar_pages),
+            _call_key('find_elements', By.CSS_SELECTOR, 'li.e_comment_item'): len(items),
+        }})
+    qunar.put_steps(f'qunar:{QUNAR_URL}', steps)
+    qunar.close()
+
+    bilibili = Cassette(paths['bilibili'])
+    bilibili.put_http('GET', "https://www.bilibili.com/", 200, html_headers, b'<html></html>')
+    nav = {'code': 0, 'data': {'wbi_img': {'img_url': 'https://i0.hdslb.com/bfs/wbi/7cd084941338484aae1ad9425b84077c.png',
+                                           'sub_url': 'https://i0.hdslb.com/bfs/wbi/4932caff0ff746eab6f01bf08b70ac45.png'}}}
+    bilibili.put_http('GET', NAV_API, 200, json_headers, json.dumps(nav).encode('utf-8'))
+    for page in range(1, bilibili_pages + 1):
+        results = [{'type': 'video', 'title': f'<em class="keyword">Python</em> 教程 {page}-{i}',
+                    'bvid': f'BV1{page:03d}{i:02d}xx', 'author': f'UP主{i}', 'play': page * 1000 + i,
+                    'video_review': i} for i in range(20)]
+        payload = {'code': 0, 'data': {'result': results, 'numPages': bilibili_pages}}
+        bilibili.put_http('GET', url_with(SEARCH_API, {'search_type': 'video', 'keyword': 'Python', 'page': page}),
+                          200, json_headers, json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+    bilibili.close()
+
+    # B站页面模式：已登录的首页，之后每页是样例搜索结果页换上该页的 BV 号，与 VIDEO_CARDS_JS 的返回值一致
+    bilibili_dom = Cassette(paths['bilibili_dom'])
+    cards = parser.video_cards(parser.parse(load_fixture('bilibili_search.html')))
+    steps = [{'calls': {}}, {'calls': {_call_key('get_cookie', 'SESSDATA'): {'name': 'SESSDATA', 'value': 'replay'}}}]
+    for page in range(1, bilibili_pages + 1):
+        page_cards = [dict(card, link='https:' + re.sub(r'BV[0-9A-Za-z]{10}', f'BV1{page:03d}{i:02d}xxxx', card['link']))
+                      if card['link'].startswith('//') else card for i, card in enumerate(cards)]
+        steps.append({'calls': {_call_key('execute_script', VIDEO_CARDS_JS, VIDEO_CARD_XPATH): page_cards}})
+    bilibili_dom.put_steps(BILIBILI_SESSION, steps)
+    bilibili_dom.close()
+    return paths
+
+
+def stage_parse(repeat=200):
+    """样例页面解析，返回 (页数, 记录数)"""
+    import spider
+    from extractors import get_backend
+
+    article = load_fixture('ajcass_article.html')
+    comments = load_fixture('qunar_comments.html')
+    parser = get_backend()
+    records = 0
+    for _ in range(repeat):
+        records += spider.parse_article_html(article, 'fixture') is not None
+        records += len(parser.comment_items(parser.parse(comments)))
+    return repeat * 2, records
+
+
+def stage_nlp(size=5000):
+    """合成评论的分词与情感分析，返回 (0, 评论数)"""
+    from nlp_engine import load_stopwords, score_sentiments, tokenize_texts
+
+    texts = synthetic_comments(size)
+    path = 'file/baidu_stopwords.txt'
+    stopwords = load_stopwords(path) if os.path.exists(path) else frozenset()
+    tokenize_texts(texts, stopwords, progress=False)
+    score_sentiments(texts, progress=False)
+    return 0, len(texts)
+
+
+SUITE_STAGES = ('journal', 'qunar', 'bilibili', 'bilibili_dom', 'parse', 'nlp')
+
+
+def run_stage(name, cassettes):
+    """在当前进程中运行一个阶段，返回耗时、CPU 与内存峰值"""
+    import replay
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if name in replay.TARGETS:
+            pages, records = replay.replay(name, cassettes[name])
+        elif name == 'parse':
+            pages, records = stage_parse()
+        else:
+            pages, records = stage_nlp()
+    wall = time.perf_counter() - start
+    own, children = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+    return {
+        'pages': pages, 'records': records, 'seconds': round(wall, 3),
+        'pages_per_s': round(pages / wall, 2) if pages else None,
+        'records_per_s': round(records / wall, 2),
+        'cpu_seconds': round(cpu, 3),
+        'cpu_ms_per_page': round(cpu / pages * 1000, 3) if pages else None,
+        'peak_rss_mb': round(max(own.ru_maxrss, children.ru_maxrss) / 1024, 1),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def bench_suite(stages=None, cassettes=None, output=None, compare=None, child=None):
+    """
+    端到端离线基准：每个阶段在独立子进程中回放，互不影响 CPU 与内存峰值
+    :param stages: 要运行的阶段，默认全部
+    :param cassettes: 真实录制文件所在目录，缺少的目标使用样例页面合成的录制文件
+    :param output: 结果 JSON 路径，默认 result/bench/<时间>_<提交>.json
+    :param compare: 之前的结果 JSON，打印各项指标的变化
+    """
+    cassettes = cassettes or os.path.join('fixtures', 'cassettes')
+    if child:
+        paths = json.loads(cassettes)
+        print(json.dumps(run_stage(child, paths)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = build_fixture_cassettes(tmp)
+        for target in paths:
+            recorded = os.path.abspath(os.path.join(cassettes, f'{target}.sqlite'))
+            if os.path.exists(recorded):
+                paths[target] = recorded
+        results = {}
+        for stage in stages or SUITE_STAGES:
+            proc = subprocess.run([sys.executable, os.path.abspath(__file__), 'suite', '--child', stage,
+                                   '--cassettes', json.dumps(paths)], capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(f"{stage} 失败:\n{proc.stderr[-2000:]}")
+                continue
+            results[stage] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    report = {'commit': _git_commit(), 'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+              'python': platform.python_version(), 'stages': results}
+    previous = None
+    if compare:
+        with open(compare, encoding='utf-8') as f:
+            previous = json.load(f)['stages']
+    print(f"{'阶段':<14}{'页/秒':>10}{'记录/秒':>12}{'CPU毫秒/页':>12}{'内存峰值MB':>12}{'耗时s':>10}")
+    for stage, r in results.items():
+        line = (f"{stage:<14}{r['pages_per_s'] or '-':>10}{r['records_per_s']:>12}"
+                f"{r['cpu_ms_per_page'] or '-':>12}{r['peak_rss_mb']:>12}{r['seconds']:>10}")
+        if previous and stage in previous:
+            line += f"   耗时 {r['seconds'] / previous[stage]['seconds'] - 1:+.1%}"
+        print(line)
+    output = output or os.path.join('result', 'bench', f"{time.strftime('%Y%m%d_%H%M%S')}_{report['commit']}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存到 {output}")
+
+
+# 启动时不应加载的重型依赖，只在用到的阶段内导入
+HEAVY_MODULES = ('pandas', 'selenium', 'pyecharts', 'matplotlib', 'jieba', 'snownlp', 'fake_useragent', 'pyarrow')
+# 入口模块 -> 导入后不应出现的模块；分析流程本身需要 pandas（安装了 pyarrow 时 pandas 会连带导入）
+STARTUP_TARGETS = {
+    'cli': HEAVY_MODULES,
+    'spider': HEAVY_MODULES,
+    'BilibiliSpider': HEAVY_MODULES,
+    'batch_runner': HEAVY_MODULES,
+    'Attractions': tuple(name for name in HEAVY_MODULES if name not in ('pandas', 'pyarrow')),
+}
+
+
+def bench_startup(repeat=5, budget=None):
+    """
+    各入口模块在新解释器中的导入耗时，并检查没有提前加载重型依赖
+    每个入口在新的空目录中运行，重型依赖按第一次（冷缓存）导入检查，耗时取各次的最小值
+    :param repeat: 每个入口导入的次数
+    :param budget: 单个入口导入耗时上限（秒），超出时视为退化
+    """
+    root = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')])))
+    problems = []
+    for module, forbidden in STARTUP_TARGETS.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            code = (f"import json, sys, time; start = time.perf_counter(); import {module}; "
+                    f"print(json.dumps([time.perf_counter() - start, sorted(sys.modules)]))")
+            runs = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                proc = subprocess.run([sys.executable, '-c', code], cwd=tmp, env=env, capture_output=True,
+                                      text=True, check=True)
+                wall = time.perf_counter() - start
+                elapsed, modules = json.loads(proc.stdout.strip().splitlines()[-1])
+                runs.append((elapsed, wall, modules))
+            # 首次导入时还没有 cache/ 下的本地缓存，最容易触发重型依赖
+            heavy = sorted(name for name in forbidden if name in runs[0][2])
+            elapsed, wall, _ = min(runs)
+            print(f"{module:<16}导入 {elapsed * 1000:8.1f} ms  进程 {wall * 1000:8.1f} ms"
+                  + (f"  提前加载: {', '.join(heavy)}" if heavy else ""))
+            if heavy:
+                problems.append(f"{module} 启动时加载了 {', '.join(heavy)}")
+            if budget and elapsed > budget:
+                problems.append(f"{module} 导入耗时 {elapsed:.2f} 秒，超过 {budget} 秒")
+    assert not problems, '；'.join(problems)
+
+
+BENCHMARKS = {
+    'cache': bench_cache,
+    'fetch': bench_fetch,
+    'parse': bench_parse,
+    'js': bench_js,
+    'sentiment': bench_sentiment,
+    'pipeline': bench_pipeline,
+    'startup': bench_startup,
+    'suite': bench_suite,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="爬虫性能基准")
+    parser.add_argument('name', choices=sorted(BENCHMARKS))
+    parser.add_argument('--sizes', type=int, nargs='+', help="数据规模（sentiment 等）")
+    parser.add_argument('--stages', nargs='+', choices=SUITE_STAGES, help="suite 要运行的阶段")
+    parser.add_argument('--cassettes', help="suite 使用的录制文件目录")
+    parser.add_argument('--output', help="suite 结果 JSON 路径")
+    parser.add_argument('--compare', help="suite 对比的历史结果 JSON")
+    parser.add_argument('--budget', type=float, help="startup 单个入口导入耗时上限（秒）")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    BENCHMARKS[args.name](**{key: value for key, value in vars(args).items() if key != 'name' and value is not None})
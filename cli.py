@@ -0,0 +1,91 @@
+"""
+统一命令行入口，各子命令运行时才导入所需的模块，启动时不加载 pandas、selenium、pyecharts 等
+用法: python cli.py crawl-journal --formats csv parquet
+      python cli.py crawl-bilibili Python 爬虫 --mode api
+      python cli.py crawl-qunar --name 杭州西湖 --url https://travel.qunar.com/p-oi708952-xihufengjingmingsheng
+      python cli.py analyze result/杭州西湖_comments.csv --name 杭州西湖
+"""
+import argparse
+
+FORMATS = ('csv', 'parquet')
+# 跨运行去重索引
+DEDUP_PATH = 'cache/dedup.sqlite'
+
+
+def crawl_journal(args):
+    import spider
+
+    spider.main(formats=tuple(args.formats), metrics_format=args.metrics_format, profile_path=args.profile)
+
+
+def crawl_bilibili(args):
+    from BilibiliSpider import crawl_keywords
+
+    counts = crawl_keywords(args.keywords, max_pages=args.pages, headless=not args.show_browser,
+                            browsers=args.browsers, mode=args.mode, formats=tuple(args.formats),
+                            metrics_format=args.metrics_format, dedup_path=DEDUP_PATH if args.dedup else None)
+    for keyword, count in counts.items():
+        print(f"{keyword}: {count} 个视频")
+
+
+def crawl_qunar(args):
+    from Attractions import QuNaRCrawler
+
+    crawler = QuNaRCrawler(args.name, args.url, formats=tuple(args.formats))
+    crawler.run(stream=args.stream, metrics_format=args.metrics_format, profile_path=args.profile)
+
+
+def analyze(args):
+    from Attractions import analyze_csv
+    from metrics import metrics, profiled
+
+    with profiled(args.profile):
+        total = analyze_csv(args.csv, args.name, chunksize=args.chunksize, workers=args.workers)
+    print(f"共分析 {total} 条评论")
+    metrics.write_run('analyze', args.metrics_format)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="期刊、B站、去哪儿爬虫与评论分析")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_command(name, handler, description):
+        command = commands.add_parser(name, help=description)
+        command.set_defaults(handler=handler)
+        command.add_argument('--metrics-format', choices=('json', 'prom'), default='json', help="运行指标的输出格式")
+        command.add_argument('--profile', help="用 cProfile 记录本次运行并保存到该路径")
+        return command
+
+    journal = add_command('crawl-journal', crawl_journal, "爬取上海研究院期刊文章")
+    journal.add_argument('--formats', nargs='+', choices=FORMATS, default=['csv'], help="输出格式")
+
+    bilibili = add_command('crawl-bilibili', crawl_bilibili, "按关键词爬取B站视频")
+    bilibili.add_argument('keywords', nargs='+', help="搜索关键词")
+    bilibili.add_argument('--pages', type=int, default=10, help="每个关键词的最大页数")
+    bilibili.add_argument('--mode', choices=('dom', 'api'), default='dom', help="页面抓取或直接请求搜索接口")
+    bilibili.add_argument('--browsers', type=int, default=2, help="同时使用的浏览器数")
+    bilibili.add_argument('--show-browser', action='store_true', help="显示浏览器窗口（扫码登录时使用）")
+    bilibili.add_argument('--formats', nargs='+', choices=FORMATS, default=['csv'], help="输出格式")
+    bilibili.add_argument('--dedup', action='store_true', help="跨运行去重，只追加之前没抓到过的视频")
+
+    qunar = add_command('crawl-qunar', crawl_qunar, "爬取去哪儿景点评论并分析")
+    qunar.add_argument('--name', default="杭州西湖", help="景点名称")
+    qunar.add_argument('--url', default='https://travel.qunar.com/p-oi708952-xihufengjingmingsheng', help="景点页面")
+    qunar.add_argument('--stream', action='store_true', help="分块分析评论，适合大规模评论集")
+    qunar.add_argument('--formats', nargs='+', choices=FORMATS, default=['csv'], help="输出格式")
+
+    analysis = add_command('analyze', analyze, "对已有的评论CSV做情感分析并生成图表")
+    analysis.add_argument('csv', help="评论CSV路径，如 result/杭州西湖_comments.csv")
+    analysis.add_argument('--name', default="杭州西湖", help="景点名称，用于图表标题和输出文件名")
+    analysis.add_argument('--chunksize', type=int, default=10000, help="每次读取的行数")
+    analysis.add_argument('--workers', type=int, help="分词与情感分析的进程数，默认 CPU 核数")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class CrawlState:
+    """
+    持久化爬取状态：已访问URL、翻页游标、已提取记录
+    每次写入立即提交，进程中断后重新运行可从断点继续
+    :param path: SQLite 文件路径
+    """
+
+    def __init__(self, path='cache/crawl_state.sqlite'):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS visited (
+                    url TEXT PRIMARY KEY,
+                    visited_at REAL
+                );
+                CREATE TABLE IF NOT EXISTS cursors (
+                    name TEXT PRIMARY KEY,
+                    value TEXT
+                );
+                CREATE TABLE IF NOT EXISTS records (
+                    kind TEXT,
+                    key TEXT,
+                    data TEXT,
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    created_at REAL,
+                    UNIQUE (kind, key)
+                );
+            """)
+            self._conn.commit()
+
+    def is_visited(self, url):
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM visited WHERE url = ?", (url,)).fetchone()
+        return row is not None
+
+    def mark_visited(self, url):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO visited VALUES (?, ?)", (url, time.time()))
+            self._conn.commit()
+
+    def get_cursor(self, name, default=None):
+        """读取翻页游标，不存在时返回 default"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM cursors WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_cursor(self, name, value):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO cursors VALUES (?, ?)", (name, json.dumps(value)))
+            self._conn.commit()
+
+    def clear_cursor(self, name):
+        with self._lock:
+            self._conn.execute("DELETE FROM cursors WHERE name = ?", (name,))
+            self._conn.commit()
+
+    def has_record(self, kind, key):
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM records WHERE kind = ? AND key = ?", (kind, key)).fetchone()
+        return row is not None
+
+    def add_record(self, kind, key, data):
+        """
+        保存一条提取结果
+        :return: 新记录返回 True，已存在返回 False
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO records (kind, key, data, created_at) VALUES (?, ?, ?, ?)",
+                (kind, key, json.dumps(data, ensure_ascii=False), time.time()))
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def records(self, kind):
+        """按写入顺序返回某类全部记录"""
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM records WHERE kind = ? ORDER BY seq", (kind,)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def iter_records(self, kind, batch_size=10000):
+        """按写入顺序分批返回某类记录，每批最多 batch_size 条"""
+        last_seq = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT seq, data FROM records WHERE kind = ? AND seq > ? ORDER BY seq LIMIT ?",
+                    (kind, last_seq, batch_size)).fetchall()
+            if not rows:
+                return
+            last_seq = rows[-1][0]
+            yield [json.loads(row[1]) for row in rows]
+
+    def count(self, kind):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM records WHERE kind = ?", (kind,)).fetchone()[0]
+
+    def close(self):
+        self._conn.close()
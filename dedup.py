@@ -0,0 +1,173 @@
+"""
+记录去重索引：精确键（URL、BV号等）+ SimHash 近似重复检测
+- 精确键与 SimHash 指纹持久化到 SQLite，重复运行时仍然有效
+- 内存中只保留最近 max_entries 个指纹的分段索引，超出时淘汰最旧的
+- 64 位指纹分成 4 段，海明距离不超过 3 的两个指纹至少有一段完全相同，只需比较同段的候选
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+BANDS = 4
+BAND_BITS = 64 // BANDS
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def simhash(text, shingle=2):
+    """按字符 shingle（默认二元组）计算 64 位 SimHash"""
+    text = _NON_WORD.sub('', text or '')
+    if len(text) <= shingle:
+        features = [text]
+    else:
+        features = {text[i:i + shingle] for i in range(len(text) - shingle + 1)}
+    weights = [0] * 64
+    for feature in features:
+        h = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def _bands(h):
+    mask = (1 << BAND_BITS) - 1
+    return [(i, h >> (i * BAND_BITS) & mask) for i in range(BANDS)]
+
+
+def _to_signed(h):
+    """SQLite 整数为有符号 64 位"""
+    return h - (1 << 64) if h >= 1 << 63 else h
+
+
+class DedupIndex:
+    """
+    可持久化的去重索引
+    :param path: SQLite 文件路径，为 None 时只在内存中（仅本次运行去重）
+    :param namespace: 索引的命名空间，如 'qunar:<景点URL>'、'bilibili:<关键词>'
+    :param max_distance: 海明距离不超过该值视为近似重复（最大 3）
+    :param min_length: 短于该长度的文本不做近似判断，只依赖精确键
+    :param max_entries: 内存中保留的指纹数上限
+    """
+
+    def __init__(self, path='cache/dedup.sqlite', namespace='default', max_distance=3, min_length=20,
+                 max_entries=200000):
+        if path is not None:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.namespace = namespace
+        self.max_distance = min(max_distance, BANDS - 1)
+        self.min_length = min_length
+        self.max_entries = max_entries
+        self.duplicates = 0
+        self.near_duplicates = 0
+        self._conn = sqlite3.connect(path or ':memory:', check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS dedup_keys (
+                    namespace TEXT,
+                    key TEXT,
+                    added_at REAL,
+                    PRIMARY KEY (namespace, key)
+                );
+                CREATE TABLE IF NOT EXISTS dedup_hashes (
+                    namespace TEXT,
+                    hash INTEGER,
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT
+                );
+                CREATE INDEX IF NOT EXISTS idx_dedup_hashes ON dedup_hashes (namespace, seq);
+            """)
+            self._conn.commit()
+        self._order = deque()
+        self._buckets = {}
+        self._load()
+
+    def _load(self):
+        """载入最近 max_entries 个指纹"""
+        rows = self._conn.execute(
+            "SELECT hash FROM dedup_hashes WHERE namespace = ? ORDER BY seq DESC LIMIT ?",
+            (self.namespace, self.max_entries)).fetchall()
+        for (h,) in reversed(rows):
+            self._remember(h % (1 << 64))
+
+    def _remember(self, h):
+        self._order.append(h)
+        for band in _bands(h):
+            self._buckets.setdefault(band, []).append(h)
+        if len(self._order) > self.max_entries:
+            old = self._order.popleft()
+            for band in _bands(old):
+                bucket = self._buckets[band]
+                bucket.remove(old)
+                if not bucket:
+                    del self._buckets[band]
+
+    def _find_near(self, h):
+        for band in _bands(h):
+            for other in self._buckets.get(band, ()):
+                if hamming(h, other) <= self.max_distance:
+                    return True
+        return False
+
+    def has_key(self, key):
+        """精确键是否已出现过"""
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM dedup_keys WHERE namespace = ? AND key = ?",
+                                     (self.namespace, key)).fetchone()
+        return row is not None
+
+    def add_key(self, key):
+        """记录精确键，之前没出现过时返回 True"""
+        with self._lock:
+            cursor = self._conn.execute("INSERT OR IGNORE INTO dedup_keys VALUES (?, ?, ?)",
+                                        (self.namespace, key, time.time()))
+            self._conn.commit()
+        if cursor.rowcount == 0:
+            self.duplicates += 1
+            return False
+        return True
+
+    def is_near_duplicate(self, text):
+        """文本是否与已记录的文本近似重复（不记录）"""
+        if len(text or '') < self.min_length:
+            return False
+        h = simhash(text)
+        with self._lock:
+            return self._find_near(h)
+
+    def add_text(self, text):
+        """记录文本指纹，与已有文本近似重复时返回 False 且不记录"""
+        if len(text or '') < self.min_length:
+            return True
+        h = simhash(text)
+        with self._lock:
+            if self._find_near(h):
+                self.near_duplicates += 1
+                return False
+            self._remember(h)
+            self._conn.execute("INSERT INTO dedup_hashes (namespace, hash) VALUES (?, ?)",
+                               (self.namespace, _to_signed(h)))
+            self._conn.commit()
+        return True
+
+    def prune(self):
+        """删除磁盘上超出 max_entries 的旧指纹"""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM dedup_hashes WHERE namespace = ? AND seq NOT IN "
+                "(SELECT seq FROM dedup_hashes WHERE namespace = ? ORDER BY seq DESC LIMIT ?)",
+                (self.namespace, self.namespace, self.max_entries))
+            self._conn.commit()
+
+    def print_stats(self):
+        print(f"去重: 重复 {self.duplicates} 条，近似重复 {self.near_duplicates} 条")
+
+    def close(self):
+        self.prune()
+        self._conn.close()
@@ -0,0 +1,133 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class DriverPool:
+    """
+    可复用的浏览器池：借出/归还、健康检查、按加载页数回收
+    多个关键词或景点共用已启动的浏览器，避免每个目标都冷启动 Chrome
+    :param factory: 无参函数，返回新的 WebDriver
+    :param size: 池中浏览器数量上限
+    :param max_pages: 单个浏览器累计加载多少页后关闭重建
+    """
+
+    def __init__(self, factory, size=2, max_pages=200):
+        self.factory = factory
+        self.size = size
+        self.max_pages = max_pages
+        self._idle = []  # 空闲浏览器栈，优先借出最近用过的
+        self._pages = {}
+        self._created = 0
+        self._closed = False
+        # 归还浏览器或浏览器被关闭（空出名额）时唤醒等待的借用方
+        self._available = threading.Condition()
+
+    def warm(self, count=None):
+        """预先启动 count 个浏览器，默认填满整个池"""
+        for _ in range(count or self.size):
+            with self._available:
+                if self._created >= self.size:
+                    return
+                self._created += 1
+            driver = self._create()
+            with self._available:
+                self._idle.append(driver)
+                self._available.notify()
+
+    def _create(self):
+        try:
+            driver = self.factory()
+        except Exception:
+            self._free_slot()
+            raise
+        self._pages[id(driver)] = 0
+        return driver
+
+    def _free_slot(self):
+        with self._available:
+            self._created -= 1
+            self._available.notify()
+
+    def _healthy(self, driver):
+        try:
+            driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, driver):
+        self._pages.pop(id(driver), None)
+        self._free_slot()
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _reset(self, driver):
+        """归还前关闭多余的标签页，回到第一个窗口"""
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+
+    def acquire(self, timeout=None):
+        """
+        借出一个可用的浏览器，池满且全部借出时最多等待 timeout 秒
+        :raises TimeoutError: 等待超时
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._available:
+                while not self._idle and self._created >= self.size:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("等待可用浏览器超时")
+                    self._available.wait(remaining)
+                if self._idle:
+                    driver = self._idle.pop()
+                else:
+                    self._created += 1
+                    driver = None
+            if driver is None:
+                return self._create()
+            if self._healthy(driver):
+                return driver
+            print("浏览器已失效，重新创建")
+            self._discard(driver)
+
+    def release(self, driver):
+        """归还浏览器；失效、已达页数上限或池已关闭时直接退出"""
+        if self._closed or self._pages.get(id(driver), 0) >= self.max_pages or not self._healthy(driver):
+            self._discard(driver)
+            return
+        try:
+            self._reset(driver)
+        except Exception:
+            self._discard(driver)
+            return
+        with self._available:
+            self._idle.append(driver)
+            self._available.notify()
+
+    def mark_pages(self, driver, count=1):
+        """记录该浏览器加载的页数，用于按页数回收"""
+        self._pages[id(driver)] = self._pages.get(id(driver), 0) + count
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """with pool.lease() as driver: 借出并在结束后自动归还"""
+        driver = self.acquire(timeout)
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def close(self):
+        """关闭池中所有空闲浏览器，之后归还的浏览器也会被关闭"""
+        self._closed = True
+        with self._available:
+            idle, self._idle = self._idle, []
+        for driver in idle:
+            self._discard(driver)
@@ -0,0 +1,226 @@
+"""
+页面解析层：同一组提取函数提供 lxml 与 BeautifulSoup 两种实现
+选择器在模块加载时编译一次，之后每页复用
+"""
+import soupsieve
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:  # 未安装 lxml 时退回 BeautifulSoup
+    etree = None
+
+
+def _has_class(name):
+    """与 BeautifulSoup 的 class 匹配规则一致：任一 class 等于 name"""
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+
+class Bs4Backend:
+    """BeautifulSoup + html.parser，原有实现，作为对照和后备"""
+    name = 'bs4'
+
+    ARTICLE_LINK = soupsieve.compile('a[href^="/Magazine/show/?id="]')
+
+    def parse(self, html):
+        return BeautifulSoup(html, 'html.parser')
+
+    def text(self, node, strip=True):
+        return node.get_text(strip=True) if strip else node.text.strip()
+
+    def article_title(self, doc):
+        temp = doc.find('div', attrs={'class': 'C_right'}).find_all('div')
+        return temp[0].get_text(strip=True)
+
+    def rows(self, doc):
+        return doc.find_all('tr')
+
+    def cells(self, row):
+        return row.find_all('td')
+
+    def paragraph(self, cell):
+        return cell.find('p')
+
+    def article_links(self, doc):
+        items = doc.select('tr')
+        links = []
+        for item in items[1:]:  # 过滤表头
+            link = self.ARTICLE_LINK.select_one(item)
+            if link:
+                links.append(link['href'])
+        return links, len(items)
+
+    def comment_items(self, doc):
+        return doc.find_all("li", attrs={"class": "e_comment_item clrfix"})
+
+    def see_more_href(self, item):
+        a = item.find("a", attrs={"class": "seeMore"})
+        return a.get('href') if a else None
+
+    def comment_text(self, item):
+        text_div = item.find("div", attrs={"class": "e_comment_content"})
+        return text_div.text.strip() if text_div else None
+
+    def comment_date(self, item):
+        add_info = item.find("div", attrs={"class": "e_comment_add_info"})
+        if add_info:
+            lis = add_info.find_all("li")
+            if lis:
+                return lis[0].text.strip()
+        return None
+
+    def full_comment_text(self, doc):
+        text_div = doc.find("div", attrs={"class": "comment_content"})
+        return text_div.text.strip() if text_div else None
+
+    VIDEO_CARDS = soupsieve.compile('div[class="video-list row"] > div')
+    CARD_TITLE = soupsieve.compile('h3[class="bili-video-card__info--tit"]')
+    CARD_LINK = soupsieve.compile('div[class="bili-video-card__info--right"] > a')
+    CARD_AUTHOR = soupsieve.compile('span[class="bili-video-card__info--author"]')
+    CARD_STATS = soupsieve.compile('span[class="bili-video-card__stats--item"]')
+
+    def video_cards(self, doc):
+        """B站搜索结果页的视频卡片，字段与 VIDEO_CARDS_JS 一致，链接为 href 原值；缺少的字段为 None"""
+        cards = []
+        for card in self.VIDEO_CARDS.select(doc):
+            title = self.CARD_TITLE.select_one(card)
+            link = self.CARD_LINK.select_one(card)
+            author = self.CARD_AUTHOR.select_one(card)
+            stats = [item.find('span', recursive=False) for item in self.CARD_STATS.select(card)[:2]]
+            stats += [None] * (2 - len(stats))
+            cards.append({
+                'title': title.text.strip() if title else None,
+                'link': link.get('href') if link else None,
+                'up': author.text.strip() if author else None,
+                'play_count': stats[0].text.strip() if stats[0] else None,
+                'comments_count': stats[1].text.strip() if stats[1] else None,
+            })
+        return cards
+
+
+class LxmlBackend(Bs4Backend):
+    """lxml（libxml2）解析，XPath 预编译"""
+    name = 'lxml'
+
+    if etree is not None:
+        PARSER = lxml_html.HTMLParser(encoding='utf-8')
+        TITLE = etree.XPath(f'(//div[{_has_class("C_right")}])[1]/descendant::div[1]')
+        ROWS = etree.XPath('//tr')
+        CELLS = etree.XPath('.//td')
+        PARAGRAPH = etree.XPath('.//p[1]')
+        DIRECTORY_LINK = etree.XPath('.//a[starts-with(@href, "/Magazine/show/?id=")]')
+        COMMENT_ITEMS = etree.XPath('//li[@class="e_comment_item clrfix"]')
+        SEE_MORE = etree.XPath(f'.//a[{_has_class("seeMore")}][1]/@href')
+        COMMENT_TEXT = etree.XPath(f'.//div[{_has_class("e_comment_content")}][1]')
+        COMMENT_DATE = etree.XPath(f'(.//div[{_has_class("e_comment_add_info")}])[1]//li')
+        FULL_COMMENT = etree.XPath(f'//div[{_has_class("comment_content")}][1]')
+        # 与 BilibiliSpider.CARD_FIELDS_XPATH 相同
+        VIDEO_CARDS = etree.XPath('//div[@class="video-list row"]/div')
+        CARD_FIELDS = {
+            'title': etree.XPath('.//h3[@class="bili-video-card__info--tit"]'),
+            'link': etree.XPath('.//div[@class="bili-video-card__info--right"]/a'),
+            'up': etree.XPath('.//span[@class="bili-video-card__info--author"]'),
+            'play_count': etree.XPath('.//span[@class="bili-video-card__stats--item"][1]/span'),
+            'comments_count': etree.XPath('.//span[@class="bili-video-card__stats--item"][2]/span'),
+        }
+
+    def parse(self, html):
+        if isinstance(html, str):
+            html = html.encode('utf-8')
+        return lxml_html.document_fromstring(html, parser=self.PARSER)
+
+    def _strings(self, node):
+        # 与 BeautifulSoup 一致：跳过注释、脚本和样式中的文字
+        for child in node.iter():
+            if child is not node and not isinstance(child.tag, str):
+                if child.tail:
+                    yield child.tail
+                continue
+            if child.tag in ('script', 'style') and child is not node:
+                if child.tail:
+                    yield child.tail
+                continue
+            if child.text and isinstance(child.tag, str):
+                yield child.text
+            if child is not node and child.tail:
+                yield child.tail
+
+    def text(self, node, strip=True):
+        if strip:
+            return ''.join(s.strip() for s in self._strings(node) if s.strip())
+        return ''.join(self._strings(node)).strip()
+
+    def _first(self, xpath, node):
+        result = xpath(node)
+        return result[0] if result else None
+
+    def article_title(self, doc):
+        return self.text(self.TITLE(doc)[0])
+
+    def rows(self, doc):
+        return self.ROWS(doc)
+
+    def cells(self, row):
+        return self.CELLS(row)
+
+    def paragraph(self, cell):
+        return self._first(self.PARAGRAPH, cell)
+
+    def article_links(self, doc):
+        items = self.ROWS(doc)
+        links = []
+        for item in items[1:]:  # 过滤表头
+            link = self._first(self.DIRECTORY_LINK, item)
+            if link is not None:
+                links.append(link.get('href'))
+        return links, len(items)
+
+    def comment_items(self, doc):
+        return self.COMMENT_ITEMS(doc)
+
+    def see_more_href(self, item):
+        return self._first(self.SEE_MORE, item)
+
+    def comment_text(self, item):
+        text_div = self._first(self.COMMENT_TEXT, item)
+        return self.text(text_div, strip=False) if text_div is not None else None
+
+    def comment_date(self, item):
+        li = self._first(self.COMMENT_DATE, item)
+        return self.text(li, strip=False) if li is not None else None
+
+    def full_comment_text(self, doc):
+        text_div = self._first(self.FULL_COMMENT, doc)
+        return self.text(text_div, strip=False) if text_div is not None else None
+
+    def video_cards(self, doc):
+        cards = []
+        for card in self.VIDEO_CARDS(doc):
+            fields = {}
+            for field, xpath in self.CARD_FIELDS.items():
+                node = self._first(xpath, card)
+                if node is None:
+                    fields[field] = None
+                else:
+                    fields[field] = node.get('href') if field == 'link' else self.text(node, strip=False)
+            cards.append(fields)
+        return cards
+
+
+BACKENDS = {
+    'bs4': Bs4Backend,
+    'lxml': LxmlBackend,
+}
+DEFAULT_BACKEND = 'lxml' if etree is not None else 'bs4'
+_instances = {}
+
+
+def get_backend(name=None):
+    """按名称返回解析后端实例，默认优先使用 lxml"""
+    name = name or DEFAULT_BACKEND
+    if name not in _instances:
+        if name == 'lxml' and etree is None:
+            raise ImportError("lxml 未安装，无法使用 lxml 解析后端")
+        _instances[name] = BACKENDS[name]()
+    return _instances[name]
@@ -0,0 +1,75 @@
+import asyncio
+from urllib.parse import urlsplit
+
+import requests
+
+from fetch_policy import FetchPolicy
+from metrics import metrics
+
+
+class AsyncFetcher:
+    """
+    基于 asyncio 的并发抓取引擎
+    :param concurrency: 全局同时进行的请求数
+    :param per_host: 单个站点同时进行的请求数上限
+    :param rate: 单个站点的初始请求速率（次/秒），之后按响应自适应调整；为 None 时不限速
+    :param session: 复用的 requests.Session，为空时新建
+    :param policy: 共享的 FetchPolicy，为空时按 rate 新建
+    """
+
+    def __init__(self, concurrency=8, per_host=4, rate=2.0, session=None, headers=None, timeout=10, policy=None):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.policy = policy or FetchPolicy(rate=rate)
+        self.timeout = timeout
+        self.failed = []  # 重试后仍失败的 url
+        self.session = session or requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+        self._slots = None
+        self._host_slots = {}
+
+    def _host_slot(self, host):
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.per_host)
+        return self._host_slots[host]
+
+    def get(self, url, **kwargs):
+        """同步请求，按策略限速与重试，供线程池调用"""
+        kwargs.setdefault('timeout', self.timeout)
+        response = self.policy.get(self.session, url, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def reset(self):
+        """重建信号量，每次进入新的事件循环前调用"""
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._host_slots = {}
+
+    async def fetch(self, url, **kwargs):
+        """在并发与限速约束下请求 url，重试后仍失败时记入 failed 并返回 None"""
+        host = urlsplit(url).netloc
+        async with self._slots, self._host_slot(host):
+            try:
+                return await asyncio.to_thread(self.get, url, **kwargs)
+            except Exception as e:
+                print(f"请求失败: {url} - {e}")
+                self.failed.append(url)
+                metrics.inc('crawler_failed_requests_total', host=host)
+                return None
+
+    async def _fetch_one(self, url, handler):
+        response = await self.fetch(url)
+        if response is None:
+            return None
+        return handler(url, response)
+
+    async def fetch_all_async(self, urls, handler):
+        """并发抓取 urls，handler(url, response) 的返回值按输入顺序排列"""
+        self.reset()
+        tasks = [self._fetch_one(url, handler) for url in urls]
+        return await asyncio.gather(*tasks)
+
+    def fetch_all(self, urls, handler):
+        """fetch_all_async 的同步入口"""
+        return asyncio.run(self.fetch_all_async(urls, handler))
@@ -0,0 +1,183 @@
+"""
+请求策略：按站点自适应限速 + 失败重试
+- 限速采用 AIMD：请求成功且延迟正常时缓慢提高速率，遇到 429/5xx 或延迟过高时成倍降低
+- 瞬时失败（连接错误、超时、可重试状态码）按带抖动的指数退避重试
+- 响应带 Retry-After 时，该站点的所有请求都暂停到指定时间之后
+"""
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+from metrics import metrics
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def parse_retry_after(value):
+    """Retry-After 可以是秒数或 HTTP 日期，返回需要等待的秒数，无法解析时返回 None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HostState:
+    """单个站点的速率与统计"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.next_at = 0.0  # 下一个请求最早可以发出的时间
+        self.blocked_until = 0.0  # Retry-After 指定的暂停截止时间
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.failures = 0
+
+
+class FetchPolicy:
+    """
+    可在线程间共享的请求策略
+    :param rate: 每个站点的初始请求速率（次/秒），为 None 时不限速，只做重试
+    :param min_rate: 降速的下限
+    :param max_rate: 提速的上限
+    :param target_latency: 响应时间超过该值（秒）视为站点吃力，开始降速
+    :param increase: 加性增：每秒流量约提高的请求数
+    :param decrease: 乘性减：降速时速率乘以该系数
+    :param retries: 最多重试次数
+    :param backoff: 指数退避的基数（秒）
+    :param max_backoff: 单次退避的上限（秒）
+    :param retry_statuses: 需要降速并重试的状态码
+    """
+
+    def __init__(self, rate=2.0, min_rate=0.2, max_rate=10.0, target_latency=2.0, increase=0.5, decrease=0.5,
+                 retries=3, backoff=1.0, max_backoff=60.0, retry_statuses=RETRY_STATUSES):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, rate or 0)
+        self.target_latency = target_latency
+        self.increase = increase
+        self.decrease = decrease
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_statuses = tuple(retry_statuses)
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def host(self, url):
+        """返回 url 所属站点的状态"""
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = HostState(self.rate)
+            return self._hosts[host]
+
+    def reserve(self, state):
+        """为下一个请求预约发出时间，返回需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, state.next_at, state.blocked_until)
+            if state.rate:
+                state.next_at = start + 1 / state.rate
+            state.requests += 1
+            return start - now
+
+    def _slow_down(self, state, retry_after=None):
+        with self._lock:
+            if state.rate:
+                state.rate = max(self.min_rate, state.rate * self.decrease)
+            if retry_after:
+                state.blocked_until = max(state.blocked_until, time.monotonic() + retry_after)
+
+    def _speed_up(self, state):
+        with self._lock:
+            if state.rate:
+                state.rate = min(self.max_rate, state.rate + self.increase / state.rate)
+
+    def backoff_delay(self, attempt, retry_after=None):
+        """第 attempt 次重试前的等待：指数退避加抖动，不短于 Retry-After"""
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+        return max(delay, retry_after or 0.0)
+
+    def request(self, session, method, url, **kwargs):
+        """
+        按策略发送请求，session 中有新鲜缓存的 GET 请求直接返回，不占用限速配额
+        :return: 最后一次的响应；不可重试的状态码直接返回，由调用方处理
+        :raises requests.RequestException: 重试次数用尽后仍然连接失败或超时
+        """
+        state = self.host(url)
+        host = urlsplit(url).netloc
+        lookup = getattr(session, 'cached_response', None)
+        if lookup is not None and method.upper() == 'GET' and not kwargs.get('stream'):
+            response = lookup(url, kwargs.get('params'))
+            if response is not None:
+                metrics.inc('crawler_cache_hits_total', host=host)
+                return response
+        for attempt in range(self.retries + 1):
+            wait = self.reserve(state)
+            if wait > 0:
+                metrics.observe('crawler_throttle_seconds', wait, host=host)
+                time.sleep(wait)
+            start = time.monotonic()
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                metrics.inc('crawler_fetch_errors_total', host=host, reason=type(e).__name__)
+                self._slow_down(state)
+                if attempt == self.retries:
+                    state.failures += 1
+                    raise
+                retry_after = None
+                print(f"请求出错，准备重试: {url} - {e}")
+            else:
+                latency = time.monotonic() - start
+                metrics.observe('crawler_fetch_seconds', latency, host=host)
+                if getattr(response, 'from_cache', False):
+                    # 304 重新验证：正文来自本地缓存，不计入下载流量
+                    metrics.inc('crawler_fetch_revalidated_total', host=host)
+                else:
+                    metrics.inc('crawler_fetch_bytes_total', len(response.content), host=host)
+                if response.status_code >= 400:
+                    metrics.inc('crawler_fetch_errors_total', host=host, reason=response.status_code)
+                if response.status_code not in self.retry_statuses:
+                    if latency > self.target_latency:
+                        self._slow_down(state)
+                    else:
+                        self._speed_up(state)
+                    return response
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                state.throttled += 1
+                self._slow_down(state, retry_after)
+                if attempt == self.retries:
+                    state.failures += 1
+                    return response
+                print(f"状态码 {response.status_code}，准备重试: {url}")
+            state.retries += 1
+            metrics.inc('crawler_fetch_retries_total', host=host)
+            time.sleep(self.backoff_delay(attempt, retry_after))
+
+    def get(self, session, url, **kwargs):
+        return self.request(session, 'GET', url, **kwargs)
+
+    def stats(self):
+        """各站点当前速率与请求统计"""
+        with self._lock:
+            return {host: {'rate': state.rate, 'requests': state.requests, 'retries': state.retries,
+                           'throttled': state.throttled, 'failures': state.failures}
+                    for host, state in self._hosts.items()}
+
+    def print_stats(self):
+        for host, stats in self.stats().items():
+            rate = f"{stats['rate']:.2f} 次/秒" if stats['rate'] else "不限速"
+            print(f"{host}: 当前速率 {rate}，请求 {stats['requests']}，重试 {stats['retries']}，"
+                  f"限流 {stats['throttled']}，失败 {stats['failures']}")
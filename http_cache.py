@@ -0,0 +1,207 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# 缓存中保留的响应头
+KEPT_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+def normalize_url(url, params=None):
+    """规范化URL作为缓存键：协议与域名小写、查询参数排序、去掉锚点"""
+    prepared = requests.PreparedRequest()
+    prepared.prepare_url(url, params)
+    parts = urlsplit(prepared.url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', query, ''))
+
+
+class HttpCache:
+    """
+    基于 SQLite 的磁盘响应缓存，按最近访问时间做 LRU 淘汰
+    :param path: 缓存文件路径
+    :param ttl: 默认有效期（秒），过期后发送条件请求重新验证
+    :param max_bytes: 缓存正文总大小上限
+    """
+
+    def __init__(self, path='cache/http_cache.sqlite', ttl=24 * 3600, max_bytes=200 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.bytes_saved = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        # 首次使用时才建库，避免导入模块即产生文件
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    body BLOB,
+                    headers TEXT,
+                    fetched_at REAL,
+                    ttl REAL,
+                    size INTEGER,
+                    accessed_at REAL
+                )""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses (accessed_at)")
+        return self._conn
+
+    def get(self, key):
+        """返回缓存项 dict，不存在时返回 None"""
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT body, headers, fetched_at, ttl FROM responses WHERE key = ?",
+                             (key,)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            db.commit()
+        body, headers, fetched_at, ttl = row
+        return {
+            'body': body,
+            'headers': json.loads(headers),
+            'fetched_at': fetched_at,
+            'ttl': ttl,
+        }
+
+    def is_fresh(self, entry, ttl=None):
+        """缓存项是否仍在有效期内，ttl 不为 None 时代替缓存项自身的有效期"""
+        return time.time() - entry['fetched_at'] < (entry['ttl'] if ttl is None else ttl)
+
+    def put(self, key, body, headers, ttl=None):
+        """写入缓存并按需淘汰最久未访问的条目"""
+        now = time.time()
+        kept = {name: headers[name] for name in KEPT_HEADERS if name in headers}
+        with self._lock:
+            db = self._db()
+            db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                       (key, body, json.dumps(kept), now, self.ttl if ttl is None else ttl, len(body), now))
+            self._evict(db)
+            db.commit()
+
+    def touch(self, key, ttl=None):
+        """304 重新验证成功后刷新抓取时间与有效期"""
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute("UPDATE responses SET fetched_at = ?, ttl = ?, accessed_at = ? WHERE key = ?",
+                       (now, self.ttl if ttl is None else ttl, now, key))
+            db.commit()
+
+    def _evict(self, db):
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in db.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        """命中率与节省流量统计"""
+        lookups = self.hits + self.misses + self.revalidated
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidated': self.revalidated,
+            'hit_rate': (self.hits + self.revalidated) / lookups if lookups else 0.0,
+            'bytes_saved': self.bytes_saved,
+        }
+
+    def print_stats(self):
+        s = self.stats()
+        print(f"缓存命中 {s['hits']} 次，重新验证 {s['revalidated']} 次，未命中 {s['misses']} 次，"
+              f"命中率 {s['hit_rate']:.1%}，节省 {s['bytes_saved'] / 1024:.1f} KB")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class CachedSession(requests.Session):
+    """
+    带磁盘缓存的 requests.Session：新鲜的缓存直接返回，过期的发送条件请求重新验证
+    可替换任意 requests.Session 使用
+    :param cache: HttpCache，为空时使用默认路径
+    :param ttl_overrides: {URL（不含查询参数）: 有效期（秒）}，如列表页设为 0 时每次都重新验证
+    """
+
+    def __init__(self, cache=None, ttl_overrides=None):
+        super().__init__()
+        self.cache = cache if cache is not None else HttpCache()
+        self.ttl_overrides = {normalize_url(url): ttl for url, ttl in (ttl_overrides or {}).items()}
+
+    def _ttl(self, key):
+        """该缓存键单独指定的有效期，没有时返回 None（使用缓存默认值）"""
+        if not self.ttl_overrides:
+            return None
+        parts = urlsplit(key)
+        return self.ttl_overrides.get(urlunsplit((parts.scheme, parts.netloc, parts.path, '', '')))
+
+    def request(self, method, url, params=None, headers=None, **kwargs):
+        if method.upper() != 'GET' or kwargs.get('stream'):
+            return super().request(method, url, params=params, headers=headers, **kwargs)
+
+        key = normalize_url(url, params)
+        ttl = self._ttl(key)
+        entry = self.cache.get(key)
+        if entry is not None and self.cache.is_fresh(entry, ttl):
+            return self._hit(key, entry)
+
+        headers = dict(headers or {})
+        if entry is not None:
+            if 'ETag' in entry['headers']:
+                headers['If-None-Match'] = entry['headers']['ETag']
+            if 'Last-Modified' in entry['headers']:
+                headers['If-Modified-Since'] = entry['headers']['Last-Modified']
+
+        response = super().request(method, url, params=params, headers=headers, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            self.cache.revalidated += 1
+            self.cache.bytes_saved += len(entry['body'])
+            self.cache.touch(key, ttl)
+            return self._from_cache(key, entry)
+
+        self.cache.misses += 1
+        if response.status_code == 200 and 'no-store' not in response.headers.get('Cache-Control', ''):
+            self.cache.put(key, response.content, response.headers, ttl)
+        return response
+
+    def cached_response(self, url, params=None):
+        """只查缓存不发请求：有新鲜的缓存时返回响应，否则返回 None"""
+        key = normalize_url(url, params)
+        entry = self.cache.get(key)
+        if entry is not None and self.cache.is_fresh(entry, self._ttl(key)):
+            return self._hit(key, entry)
+        return None
+
+    def _hit(self, key, entry):
+        self.cache.hits += 1
+        self.cache.bytes_saved += len(entry['body'])
+        return self._from_cache(key, entry)
+
+    def _from_cache(self, key, entry):
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.url = key
+        response._content = entry['body']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.from_cache = True
+        return response
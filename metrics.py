@@ -0,0 +1,223 @@
+"""
+运行指标：各阶段耗时直方图、吞吐、下载字节与错误计数
+模块级 metrics 在线程间共享，运行结束时导出 JSON 或 Prometheus 文本格式
+profiled() 可选地用 cProfile 记录热点函数
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+
+# 直方图的桶上界（秒）
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """Prometheus 风格的累计计数：[(上界, 不超过该上界的次数)]"""
+        total, result = 0, []
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, q):
+        """按桶估计分位数，返回所在桶的上界，超出最大的桶时返回 None"""
+        target = q * self.count
+        for bound, total in self.cumulative():
+            if total >= target:
+                return bound
+        return None
+
+
+def _label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+
+class Metrics:
+    """计数器与直方图，键为 (指标名, 排好序的标签)"""
+
+    def __init__(self):
+        self.started = time.time()
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        """计数器加 value，如 inc('crawler_errors_total', site='qunar', stage='detail')"""
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """直方图记录一次观测值"""
+        key = self._key(name, labels)
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = Histogram()
+            self._histograms[key].observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """with metrics.timer('crawler_parse_seconds', site='ajcass'): 记录代码块耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self._counters = {}
+            self._histograms = {}
+
+    def snapshot(self):
+        """可序列化为 JSON 的指标汇总"""
+        with self._lock:
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self._counters.items())]
+            histograms = [{'name': name, 'labels': dict(labels), 'count': h.count, 'sum': round(h.sum, 6),
+                           'mean': round(h.sum / h.count, 6) if h.count else 0.0,
+                           'p50': h.quantile(0.5), 'p95': h.quantile(0.95),
+                           'buckets': {str(bound): total for bound, total in h.cumulative()}}
+                          for (name, labels), h in sorted(self._histograms.items())]
+        return {'started': self.started, 'duration_seconds': round(time.time() - self.started, 3),
+                'counters': counters, 'histograms': histograms}
+
+    def to_prometheus(self):
+        """Prometheus 文本格式（可供 node_exporter 的 textfile 收集器读取）"""
+        lines = []
+        with self._lock:
+            typed = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                if name not in typed:
+                    lines.append(f'# TYPE {name} counter')
+                    typed.add(name)
+                lines.append(f'{name}{_label_text(labels)} {value}')
+            for (name, labels), h in sorted(self._histograms.items()):
+                if name not in typed:
+                    lines.append(f'# TYPE {name} histogram')
+                    typed.add(name)
+                for bound, total in h.cumulative():
+                    lines.append(f'{name}_bucket{_label_text(labels, [("le", bound)])} {total}')
+                lines.append(f'{name}_bucket{_label_text(labels, [("le", "+Inf")])} {h.count}')
+                lines.append(f'{name}_sum{_label_text(labels)} {h.sum}')
+                lines.append(f'{name}_count{_label_text(labels)} {h.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """按扩展名写出：.prom 为 Prometheus 文本格式，其余为 JSON"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            if path.endswith('.prom'):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        return path
+
+    def write_run(self, name, fmt='json', directory='result/metrics'):
+        """写出本次运行的指标文件 <directory>/<name>_<时间>.<json|prom>，并打印摘要"""
+        path = os.path.join(directory, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}.{fmt}")
+        self.write(path)
+        self.print_summary()
+        print(f"运行指标已保存到 {path}")
+        return path
+
+    def print_summary(self):
+        snapshot = self.snapshot()
+        for h in snapshot['histograms']:
+            labels = ','.join(f'{k}={v}' for k, v in h['labels'].items())
+            p95 = f"≤ {h['p95']}" if h['p95'] is not None else f"> {BUCKETS[-1]}"
+            print(f"{h['name']}[{labels}]: {h['count']} 次，合计 {h['sum']:.2f} 秒，"
+                  f"平均 {h['mean'] * 1000:.1f} 毫秒，p95 {p95} 秒")
+        for c in snapshot['counters']:
+            labels = ','.join(f'{k}={v}' for k, v in c['labels'].items())
+            print(f"{c['name']}[{labels}]: {c['value']}")
+
+
+metrics = Metrics()
+
+
+class TargetRun:
+    """
+    批量任务中单个目标的运行记录：状态、条数和各阶段耗时
+    with TargetRun('杭州西湖') as run: 其中 with run.stage('crawl'): 的耗时记入 row['crawl_seconds']
+    代码块抛出异常时记为 failed 并打印堆栈，不影响其他目标
+    """
+
+    def __init__(self, target):
+        self.row = {'target': target, 'status': 'ok', 'items': 0, 'crawl_seconds': 0.0,
+                    'analyze_seconds': 0.0, 'total_seconds': 0.0, 'error': ''}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.row[f'{name}_seconds'] = round(time.perf_counter() - start, 2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and not issubclass(exc_type, Exception):
+            return False
+        if exc is not None:
+            traceback.print_exception(exc_type, exc, tb)
+            self.row['status'], self.row['error'] = 'failed', str(exc)
+        row = self.row
+        row['total_seconds'] = round(time.perf_counter() - self._started, 2)
+        print(f"{row['target']}: {row['status']}，{row['items']} 条，耗时 {row['total_seconds']} 秒")
+        return True
+
+
+@contextmanager
+def profiled(path=None, top=20):
+    """
+    with profiled('result/profile.prof'): 用 cProfile 记录代码块，path 为 None 时不做任何事
+    结束时保存 .prof 文件并打印累计耗时最多的 top 个函数
+    """
+    if path is None:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        profiler.dump_stats(path)
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(top)
+        print(report.getvalue())
+        print(f"性能剖析已保存到 {path}")
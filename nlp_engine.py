@@ -0,0 +1,265 @@
+"""
+评论情感打分引擎：去重后分块交给进程池并行计算
+结果与逐条调用 SnowNLP(text).sentiments 完全相同
+NlpCache 按评论内容哈希持久化分词与情感结果，增量运行只处理新评论
+shared_workers() 让批量任务的多个目标共用一个预热过的进程池
+"""
+import hashlib
+import importlib.util
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+
+from tqdm import tqdm
+
+from metrics import metrics
+
+
+def _file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+def sentiment_model_version():
+    """SnowNLP 情感模型文件的哈希，模型更新后缓存自动失效（不导入模型本身）"""
+    package_dir = importlib.util.find_spec('snownlp').submodule_search_locations[0]
+    path = os.path.join(package_dir, 'sentiment', 'sentiment.marshal')
+    if os.path.exists(path + '.3'):
+        path += '.3'
+    return 'snownlp-' + _file_digest(path)
+
+
+def tokenizer_version(stopwords):
+    """jieba 版本与停用词表共同决定分词结果"""
+    import jieba
+    digest = hashlib.sha1('\n'.join(sorted(stopwords)).encode('utf-8')).hexdigest()[:12]
+    return f'jieba-{jieba.__version__}-{digest}'
+
+
+class NlpCache:
+    """
+    以评论文本哈希为键的持久化结果缓存，按最近访问时间淘汰
+    :param path: SQLite 文件路径
+    :param max_entries: 最多保留的条目数
+    """
+
+    def __init__(self, path='cache/nlp_cache.sqlite', max_entries=500000):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.max_entries = max_entries
+        self.counters = {}
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                kind TEXT,
+                key TEXT,
+                value TEXT,
+                accessed_at REAL,
+                PRIMARY KEY (kind, key)
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_accessed ON results (accessed_at)")
+
+    @staticmethod
+    def _key(text):
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def _count(self, name, hits, misses):
+        counter = self.counters.setdefault(name, [0, 0])
+        counter[0] += hits
+        counter[1] += misses
+
+    def get_many(self, name, version, texts):
+        """
+        批量查询
+        :param name: 结果类别，如 'tokens'、'sentiment'
+        :param version: 模型/停用词版本，版本不同视为未命中
+        :return: {文本: 结果}，只包含命中的文本
+        """
+        kind = f'{name}:{version}'
+        keys = {self._key(text): text for text in texts}
+        found = {}
+        key_list = list(keys)
+        for i in range(0, len(key_list), 500):
+            batch = key_list[i:i + 500]
+            rows = self._conn.execute(
+                f"SELECT key, value FROM results WHERE kind = ? AND key IN ({','.join('?' * len(batch))})",
+                [kind] + batch).fetchall()
+            for key, value in rows:
+                found[keys[key]] = json.loads(value)
+        now = time.time()
+        self._conn.executemany("UPDATE results SET accessed_at = ? WHERE kind = ? AND key = ?",
+                               [(now, kind, self._key(text)) for text in found])
+        self._conn.commit()
+        self._count(name, len(found), len(keys) - len(found))
+        return found
+
+    def put_many(self, name, version, results):
+        """批量写入 {文本: 结果}，超出上限时淘汰最久未访问的条目"""
+        kind = f'{name}:{version}'
+        now = time.time()
+        self._conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                               [(kind, self._key(text), json.dumps(value, ensure_ascii=False), now)
+                                for text, value in results.items()])
+        excess = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self._conn.execute("DELETE FROM results WHERE rowid IN "
+                               "(SELECT rowid FROM results ORDER BY accessed_at LIMIT ?)", (excess,))
+        self._conn.commit()
+
+    def print_stats(self):
+        labels = {'tokens': '分词缓存', 'sentiment': '情感缓存'}
+        for name, (hits, misses) in self.counters.items():
+            total = hits + misses
+            rate = hits / total if total else 0.0
+            print(f"{labels.get(name, name)}: 命中 {hits}，未命中 {misses}，命中率 {rate:.1%}")
+
+    def close(self):
+        self._conn.close()
+
+
+_stopwords = frozenset()
+# shared_workers() 期间共用的进程池及其加载的停用词
+_shared_executor = None
+_shared_stopwords = None
+
+
+def _warm_up():
+    """进程初始化时加载 SnowNLP 模型，避免每个分块重复加载"""
+    from snownlp import SnowNLP
+    SnowNLP('预热').sentiments
+
+
+def _warm_up_jieba(stopwords):
+    """进程初始化时加载 jieba 词典并保存停用词"""
+    global _stopwords
+    import jieba
+    jieba.initialize()
+    _stopwords = stopwords
+
+
+def _warm_up_all(stopwords):
+    """共用进程池的初始化：jieba 与 SnowNLP 都只加载一次"""
+    _warm_up_jieba(stopwords)
+    _warm_up()
+
+
+def _score_chunk(texts):
+    from snownlp import SnowNLP
+    return [SnowNLP(text).sentiments for text in texts]
+
+
+def _tokenize_chunk(texts):
+    import jieba
+    return [[word for word in jieba.cut(text) if word not in _stopwords and len(word) > 1] for text in texts]
+
+
+def _map_chunks(func, texts, workers, chunk_size, desc, progress, initializer=None, initargs=(), executor=None):
+    """
+    分块处理 texts，workers 大于 1 且不止一个分块时使用进程池，结果按原顺序拼接
+    传入 executor 时直接使用这个已预热的进程池
+    """
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    workers = workers or os.cpu_count() or 1
+    bar = tqdm(total=len(texts), desc=desc, disable=not progress)
+
+    results = []
+    if executor is not None:
+        for chunk, chunk_results in zip(chunks, executor.map(func, chunks)):
+            results.extend(chunk_results)
+            bar.update(len(chunk))
+    elif workers == 1 or len(chunks) <= 1:
+        if initializer is not None and chunks:
+            initializer(*initargs)
+        for chunk in chunks:
+            results.extend(func(chunk))
+            bar.update(len(chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                                 initializer=initializer, initargs=initargs) as executor:
+            for chunk, chunk_results in zip(chunks, executor.map(func, chunks)):
+                results.extend(chunk_results)
+                bar.update(len(chunk))
+    bar.close()
+    return results
+
+
+@lru_cache(maxsize=None)
+def load_stopwords(path='file/baidu_stopwords.txt'):
+    """读取停用词表，同一路径只读取一次"""
+    with open(path, encoding='utf-8') as f:
+        return frozenset(line.strip() for line in f)
+
+
+def tokenize_texts(texts, stopwords, workers=None, chunk_size=500, progress=True):
+    """
+    jieba 分词并去除停用词和单字，每条文本只分词一次
+    :param texts: 文本序列
+    :param stopwords: 停用词集合
+    :param workers: 进程数，默认 CPU 核数，每个进程预先加载词典
+    :return: 与 texts 顺序一致的词列表
+    """
+    texts = list(texts)
+    stopwords = frozenset(stopwords)
+    # 共用进程池只在停用词一致时可用
+    executor = _shared_executor if stopwords == _shared_stopwords else None
+    metrics.inc('nlp_texts_total', len(texts), stage='tokenize')
+    with metrics.timer('nlp_seconds', stage='tokenize'):
+        return _map_chunks(_tokenize_chunk, texts, workers, chunk_size, "分词", progress,
+                           initializer=_warm_up_jieba, initargs=(stopwords,), executor=executor)
+
+
+def score_sentiments(texts, workers=None, chunk_size=500, progress=True, cache=None):
+    """
+    计算一组文本的情感得分
+    :param texts: 文本序列
+    :param workers: 进程数，默认 CPU 核数；为 1 或文本不足一个分块时在当前进程计算
+    :param chunk_size: 每个分块的文本数
+    :param progress: 是否显示进度条
+    :param cache: NlpCache，提供时只计算缓存中没有的文本
+    :return: 与 texts 顺序一致的得分列表
+    """
+    texts = list(texts)
+    # 相同文本只计算一次
+    unique = list(dict.fromkeys(texts))
+    cached = {}
+    if cache is not None:
+        version = sentiment_model_version()
+        cached = cache.get_many('sentiment', version, unique)
+        unique = [text for text in unique if text not in cached]
+    metrics.inc('nlp_texts_total', len(unique), stage='sentiment')
+    with metrics.timer('nlp_seconds', stage='sentiment'):
+        scores = _map_chunks(_score_chunk, unique, workers, chunk_size, "情感分析", progress,
+                             initializer=_warm_up, executor=_shared_executor)
+
+    lookup = dict(zip(unique, scores))
+    if cache is not None and lookup:
+        cache.put_many('sentiment', version, lookup)
+    lookup.update(cached)
+    return [lookup[text] for text in texts]
+
+
+@contextmanager
+def shared_workers(workers=None, stopwords=None):
+    """
+    with shared_workers(4): 期间所有分词与情感分析共用一个进程池，
+    每个进程只加载一次 jieba 词典和 SnowNLP 模型，可被多个线程同时使用
+    :param workers: 进程数，默认 CPU 核数
+    :param stopwords: 进程中预先加载的停用词，默认 load_stopwords()
+    已在外层 shared_workers 中时直接复用外层的进程池
+    """
+    global _shared_executor, _shared_stopwords
+    if _shared_executor is not None:
+        yield _shared_executor
+        return
+    stopwords = frozenset(load_stopwords() if stopwords is None else stopwords)
+    executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                                   initializer=_warm_up_all, initargs=(stopwords,))
+    _shared_executor, _shared_stopwords = executor, stopwords
+    try:
+        yield executor
+    finally:
+        _shared_executor = _shared_stopwords = None
+        executor.shutdown()
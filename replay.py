@@ -0,0 +1,493 @@
+"""
+离线录制/回放：抓一次真实的 HTTP 响应和浏览器页面快照，之后完全离线重跑三个爬虫
+- recording(cassette)：所有 requests 会话的响应写入录制文件
+- replaying(cassette)：启动本地桩服务器，所有请求改发到桩服务器，由录制文件应答
+- RecordingDriver / ReplayDriver：按步骤（打开页面、点击）记录并回放浏览器的页面源码、脚本结果和元素数量
+
+用法：
+    python replay.py record qunar --cassette fixtures/cassettes/qunar.sqlite
+    python replay.py replay qunar --cassette fixtures/cassettes/qunar.sqlite
+    python replay.py replay bilibili_dom
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlsplit, urlunsplit
+
+from requests.adapters import HTTPAdapter
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException
+
+import fetch_policy
+import waits
+
+# 每次请求都会变化的签名参数（B站 WBI），不参与匹配
+IGNORED_PARAMS = {'wts', 'w_rid'}
+# 回放时仍需转发的响应头
+REPLAYED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Retry-After')
+
+
+def request_key(method, url):
+    """录制文件中的请求键：方法 + 规范化URL（查询参数排序，去掉签名参数）"""
+    parts = urlsplit(url)
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                             if k not in IGNORED_PARAMS))
+    return f"{method.upper()} " + urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', query, ''))
+
+
+def _call_key(method, *args):
+    return json.dumps([method] + list(args), ensure_ascii=False, default=str)
+
+
+class Cassette:
+    """
+    录制文件：HTTP 响应与浏览器会话的页面快照，保存在同一个 SQLite 文件中
+    :param path: 文件路径
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS http (
+                key TEXT PRIMARY KEY,
+                status INTEGER,
+                headers TEXT,
+                body BLOB
+            )""")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS steps (
+                session TEXT,
+                step INTEGER,
+                data TEXT,
+                PRIMARY KEY (session, step)
+            )""")
+        self._conn.commit()
+
+    def put_http(self, method, url, status, headers, body):
+        headers = {name: headers[name] for name in REPLAYED_HEADERS if name in headers}
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO http VALUES (?, ?, ?, ?)",
+                               (request_key(method, url), status, json.dumps(headers), body))
+            self._conn.commit()
+
+    def get_http(self, method, url):
+        """返回 (状态码, 响应头, 正文)，未录制时返回 None"""
+        with self._lock:
+            row = self._conn.execute("SELECT status, headers, body FROM http WHERE key = ?",
+                                     (request_key(method, url),)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), row[2]
+
+    def put_steps(self, session, steps):
+        with self._lock:
+            self._conn.execute("DELETE FROM steps WHERE session = ?", (session,))
+            self._conn.executemany("INSERT INTO steps VALUES (?, ?, ?)",
+                                   [(session, i, json.dumps(step, ensure_ascii=False)) for i, step in enumerate(steps)])
+            self._conn.commit()
+
+    def get_steps(self, session):
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM steps WHERE session = ? ORDER BY step", (session,)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def close(self):
+        self._conn.close()
+
+
+@contextmanager
+def recording(cassette):
+    """期间所有 requests 会话收到的响应都写入 cassette"""
+    original = HTTPAdapter.send
+
+    def send(adapter, request, **kwargs):
+        response = original(adapter, request, **kwargs)
+        cassette.put_http(request.method, request.url, response.status_code, response.headers, response.content)
+        return response
+
+    HTTPAdapter.send = send
+    try:
+        yield cassette
+    finally:
+        HTTPAdapter.send = original
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """路径形如 /<协议>/<域名>/<原路径>?<原查询>，还原出原始URL后从录制文件应答"""
+    cassette = None
+
+    def _original_url(self):
+        parts = urlsplit(self.path)
+        scheme, host, path = (parts.path.lstrip('/').split('/', 2) + ['', ''])[:3]
+        return urlunsplit((scheme, unquote(host), '/' + path, parts.query, ''))
+
+    def _replay(self, method):
+        entry = self.cassette.get_http(method, self._original_url())
+        if entry is None:
+            # 状态行只能是 latin-1，说明文字用英文
+            self.send_error(404, "Not recorded")
+            return
+        status, headers, body = entry
+        if headers.get('ETag') and self.headers.get('If-None-Match') == headers['ETag']:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._replay('GET')
+
+    def do_POST(self):
+        self._replay('POST')
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ReplayServer:
+    """在后台线程运行的本地桩服务器"""
+
+    def __init__(self, cassette):
+        handler = type('Handler', (ReplayHandler,), {'cassette': cassette})
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def local_url(self, url):
+        """原始URL -> 桩服务器上的URL"""
+        parts = urlsplit(url)
+        path = f"/{parts.scheme}/{quote(parts.netloc, safe='')}{parts.path or '/'}"
+        return self.base_url + path + (f"?{parts.query}" if parts.query else '')
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@contextmanager
+def replaying(cassette, throttle=False):
+    """
+    期间所有 requests 会话的请求都转发到本地桩服务器，由 cassette 应答
+    :param throttle: 为 False 时关闭请求限速和翻页间隔，只测量程序本身的耗时
+    """
+    server = ReplayServer(cassette)
+    original_send = HTTPAdapter.send
+    original_reserve = fetch_policy.FetchPolicy.reserve
+    original_wait = waits.RateLimiter.wait
+
+    def send(adapter, request, **kwargs):
+        if not request.url.startswith(server.base_url):
+            request = request.copy()
+            request.url = server.local_url(request.url)
+        return original_send(adapter, request, **kwargs)
+
+    HTTPAdapter.send = send
+    if not throttle:
+        fetch_policy.FetchPolicy.reserve = lambda policy, state: 0.0
+        waits.RateLimiter.wait = lambda limiter: None
+    try:
+        yield server
+    finally:
+        HTTPAdapter.send = original_send
+        fetch_policy.FetchPolicy.reserve = original_reserve
+        waits.RateLimiter.wait = original_wait
+        server.close()
+
+
+class RecordingElement:
+    """包装真实元素：点击视为进入新的一步"""
+
+    def __init__(self, element, driver):
+        self._element = element
+        self._driver = driver
+
+    def click(self):
+        self._driver.new_step()
+        return self._element.click()
+
+    def __getattr__(self, name):
+        return getattr(self._element, name)
+
+
+class RecordingDriver:
+    """
+    包装真实 WebDriver，按步骤记录页面源码、脚本返回值和元素数量
+    打开页面或点击元素开始新的一步，结束后调用 save()
+    """
+
+    def __init__(self, driver, cassette, session):
+        self._driver = driver
+        self._cassette = cassette
+        self._session = session
+        self.steps = []
+        self.new_step()
+
+    def new_step(self):
+        self.steps.append({'calls': {}})
+
+    def _record(self, key, value):
+        try:
+            json.dumps(value)
+        except TypeError:  # 返回了元素等无法序列化的对象，不记录
+            return
+        self.steps[-1]['calls'][key] = value
+
+    def get(self, url):
+        self.new_step()
+        self._driver.get(url)
+
+    def execute_script(self, script, *args):
+        result = self._driver.execute_script(script, *args)
+        self._record(_call_key('execute_script', script, *args), result)
+        return result
+
+    @property
+    def page_source(self):
+        source = self._driver.page_source
+        self._record('page_source', source)
+        return source
+
+    def find_elements(self, by, value):
+        elements = self._driver.find_elements(by, value)
+        self._record(_call_key('find_elements', by, value), len(elements))
+        return [RecordingElement(element, self) for element in elements]
+
+    def find_element(self, by, value):
+        try:
+            element = self._driver.find_element(by, value)
+        except NoSuchElementException:
+            self._record(_call_key('find_elements', by, value), 0)
+            raise
+        self._record(_call_key('find_elements', by, value), 1)
+        return RecordingElement(element, self)
+
+    def get_cookie(self, name):
+        cookie = self._driver.get_cookie(name)
+        self._record(_call_key('get_cookie', name), cookie)
+        return cookie
+
+    def save(self):
+        self._cassette.put_steps(self._session, self.steps)
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+
+class ReplayElement:
+    """回放的元素：点击进入下一步，之后旧元素即失效"""
+
+    def __init__(self, driver):
+        self._driver = driver
+        self._step = driver.step
+
+    def click(self):
+        self._driver.step += 1
+
+    def is_enabled(self):
+        if self._driver.step != self._step:
+            raise StaleElementReferenceException("页面已切换")
+        return True
+
+    def is_displayed(self):
+        return self.is_enabled()
+
+
+class ReplayDriver:
+    """按录制的步骤应答的假 WebDriver，支持爬虫用到的接口"""
+
+    # 就绪等待脚本直接返回“已就绪”
+    SCRIPTS = {
+        "return document.readyState": "complete",
+        "return 1": 1,
+        waits._OBSERVE_JS: 1e9,
+    }
+
+    def __init__(self, cassette, session):
+        self.steps = cassette.get_steps(session)
+        if not self.steps:
+            raise ValueError(f"录制文件中没有会话 {session}")
+        self.step = 0
+        self.window_handles = ['replay']
+        self.switch_to = self
+
+    def _calls(self):
+        return self.steps[min(self.step, len(self.steps) - 1)]['calls']
+
+    def get(self, url):
+        self.step += 1
+
+    def execute_script(self, script, *args):
+        if script in self.SCRIPTS:
+            return self.SCRIPTS[script]
+        return self._calls().get(_call_key('execute_script', script, *args))
+
+    @property
+    def page_source(self):
+        return self._calls().get('page_source', '')
+
+    @property
+    def current_url(self):
+        return ''
+
+    def find_elements(self, by, value):
+        return [ReplayElement(self) for _ in range(self._calls().get(_call_key('find_elements', by, value), 0))]
+
+    def find_element(self, by, value):
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise NoSuchElementException(f"{by}={value}")
+        return elements[0]
+
+    def get_cookie(self, name):
+        return self._calls().get(_call_key('get_cookie', name))
+
+    def get_cookies(self):
+        return []
+
+    def window(self, handle):
+        pass
+
+    def close(self):
+        pass
+
+    def quit(self):
+        pass
+
+
+@contextmanager
+def isolated_workdir():
+    """在临时目录中运行，缓存、爬取状态和结果文件都不影响工作目录；停用词等资源目录链接过去"""
+    cwd = os.getcwd()
+    tmp = tempfile.mkdtemp(prefix='replay_')
+    for name in ('file', 'fixtures'):
+        if os.path.isdir(os.path.join(cwd, name)):
+            os.symlink(os.path.join(cwd, name), os.path.join(tmp, name))
+    os.chdir(tmp)
+    try:
+        yield tmp
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+QUNAR_NAME = "杭州西湖"
+QUNAR_URL = 'https://travel.qunar.com/p-oi708952-xihufengjingmingsheng'
+BILIBILI_KEYWORD = "Python"
+BILIBILI_SESSION = f'bilibili:{BILIBILI_KEYWORD}'
+
+
+def run_journal():
+    """spider.main 的一次完整运行，返回 (页数, 文章数)"""
+    import spider
+
+    # 每次回放使用新的会话，缓存库在当前（隔离的）工作目录中重新打开
+    spider.session = spider.create_session()
+    directory_pages, count = spider.main()
+    # 页数为目录页与新文章的详情页之和
+    return directory_pages + count, count
+
+
+def run_qunar(driver, pages=20, analyze=False):
+    """QuNaRCrawler 抓取（可选分析），返回 (页数, 评论数)"""
+    from Attractions import QuNaRCrawler
+
+    crawler = QuNaRCrawler(QUNAR_NAME, QUNAR_URL, driver=driver)
+    try:
+        df = crawler.scrape_qunar_comments(pages=pages)
+        if analyze and not df.empty:
+            crawler.analyze(df)
+    finally:
+        crawler.close()
+    return crawler.pages_crawled, len(df)
+
+
+def run_bilibili(driver=None, max_pages=10):
+    """BilibiliCrawler 抓取，传入 driver 时为默认的页面模式，否则为接口模式，返回 (页数, 视频数)"""
+    from BilibiliSpider import BilibiliCrawler
+
+    crawler = BilibiliCrawler(BILIBILI_KEYWORD, max_pages=max_pages, driver=driver,
+                              mode='api' if driver is None else 'dom')
+    crawler.crawl()
+    crawler.save()
+    return crawler.pages_crawled, len(crawler.data)
+
+
+def record(target, cassette_path):
+    """真实访问网站一次，录制 target 的全部响应"""
+    cassette = Cassette(cassette_path)
+    try:
+        with recording(cassette):
+            if target == 'journal':
+                with isolated_workdir():
+                    run_journal()
+            elif target == 'qunar':
+                from Attractions import create_browser
+                driver = RecordingDriver(create_browser(), cassette, f'qunar:{QUNAR_URL}')
+                try:
+                    with isolated_workdir():
+                        run_qunar(driver)
+                finally:
+                    driver.save()
+                    driver.quit()
+            elif target == 'bilibili_dom':
+                from BilibiliSpider import create_browser
+                # 显示浏览器窗口，需要时扫码登录
+                driver = RecordingDriver(create_browser(headless=False), cassette, BILIBILI_SESSION)
+                try:
+                    with isolated_workdir():
+                        run_bilibili(driver)
+                finally:
+                    driver.save()
+                    driver.quit()
+            else:
+                with isolated_workdir():
+                    run_bilibili()
+    finally:
+        cassette.close()
+    print(f"已录制到 {cassette_path}")
+
+
+def replay(target, cassette_path, analyze=False):
+    """离线回放 target，返回 (页数, 记录数)"""
+    cassette = Cassette(cassette_path)
+    try:
+        with replaying(cassette), isolated_workdir():
+            if target == 'journal':
+                return run_journal()
+            if target == 'qunar':
+                return run_qunar(ReplayDriver(cassette, f'qunar:{QUNAR_URL}'), analyze=analyze)
+            if target == 'bilibili_dom':
+                return run_bilibili(ReplayDriver(cassette, BILIBILI_SESSION))
+            return run_bilibili()
+    finally:
+        cassette.close()
+
+
+# bilibili 为接口模式，bilibili_dom 为默认的浏览器页面模式
+TARGETS = ('journal', 'qunar', 'bilibili', 'bilibili_dom')
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="录制或离线回放爬虫的网络请求")
+    parser.add_argument('action', choices=('record', 'replay'))
+    parser.add_argument('target', choices=TARGETS)
+    parser.add_argument('--cassette', help="录制文件路径，默认 fixtures/cassettes/<target>.sqlite")
+    args = parser.parse_args()
+    path = args.cassette or os.path.join('fixtures', 'cassettes', f'{args.target}.sqlite')
+    if args.action == 'record':
+        record(args.target, path)
+    else:
+        pages, records = replay(args.target, path)
+        print(f"回放完成：{pages} 页，{records} 条记录")
@@ -0,0 +1,240 @@
+"""
+结果输出层：CSV 与 Parquet 两种输出，统一 write(rows) / close() 接口
+Parquet 按 schema 写入带类型的列（日期为时间戳、计数为整数），
+按 source=来源/[其他分区]/day=日期 分区，每批追加一个文件，下游可按分区过滤而不必全量读取
+pyarrow 在第一次输出或读取 Parquet 时才导入，未安装时只能输出 CSV
+"""
+import csv
+import os
+import re
+import shutil
+import time
+from datetime import datetime
+
+DATE_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d')
+_COUNT_UNITS = {'万': 10000, '亿': 100000000}
+
+
+def _arrow(action):
+    """按需导入 pyarrow，返回 (pyarrow, pyarrow.parquet)"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:  # 未安装 pyarrow 时只支持 CSV
+        raise ImportError(f"pyarrow 未安装，无法{action} Parquet") from None
+    return pa, pq
+
+
+def parse_count(value):
+    """把 123、'1,234'、'1.2万' 等计数转为 int，无法解析时返回 None"""
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value)
+    match = re.fullmatch(r'([\d.]+)\s*([万亿]?)', str(value).strip().replace(',', ''))
+    if not match:
+        return None
+    try:
+        return int(round(float(match.group(1)) * _COUNT_UNITS.get(match.group(2), 1)))
+    except ValueError:
+        return None
+
+
+def parse_date(value):
+    """把 'YYYY-MM-DD[ HH:MM[:SS]]' 转为 datetime，无法解析（如“未知日期”）时返回 None"""
+    if isinstance(value, datetime):
+        return value
+    text = str(value or '').strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def parse_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+_CONVERTERS = {
+    'string': lambda value: None if value is None else str(value),
+    'int': parse_count,
+    'float': parse_float,
+    'timestamp': parse_date,
+}
+
+
+class CsvSink:
+    """
+    逐批写入 UTF-8-BOM CSV，每批写完立即 flush
+    :param path: 文件路径
+    :param fieldnames: 列名
+    :param append: 文件已存在时追加而不重写表头
+    """
+
+    def __init__(self, path, fieldnames, append=False):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.count = 0
+        append = append and os.path.exists(path)
+        self._file = open(path, 'a' if append else 'w', newline='', encoding='utf-8-sig')
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames, extrasaction='ignore')
+        if not append:
+            self._writer.writeheader()
+
+    def write(self, rows):
+        rows = list(rows)
+        self._writer.writerows(rows)
+        self._file.flush()
+        self.count += len(rows)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ParquetSink:
+    """
+    带类型的分区 Parquet 数据集，缓冲 batch_size 行后写出一个文件
+    目录结构：root/source=<来源>/<键>=<值>/.../day=<YYYY-MM-DD>/part-<时间戳>-<序号>.parquet
+    每个来源是一个独立的数据集，列结构一致
+    :param root: 数据集根目录
+    :param schema: [(列名, 类型)]，类型为 'string'、'int'、'float'、'timestamp'
+    :param source: 来源，如 'qunar'、'bilibili'、'ajcass'
+    :param date_field: 按该时间戳列的日期分区，None 或无法解析时按写入当天分区
+    :param partitions: 额外的固定分区，如 {'keyword': 'Python'}
+    :param batch_size: 每个文件的最大行数
+    :param replace: 先删除固定分区下已有的文件，每次写出全量数据时使用，重复运行不会累积重复行
+    """
+
+    def __init__(self, root, schema, source, date_field=None, partitions=None, batch_size=5000, replace=False):
+        pa, pq = _arrow('输出')
+        self._pa, self._pq = pa, pq
+        self.root = root
+        self.schema = list(schema)
+        self.source = source
+        self.date_field = date_field
+        self.partitions = dict(partitions or {})
+        self.batch_size = batch_size
+        self.count = 0
+        self._buffer = []
+        self._parts = 0
+        self._arrow_schema = pa.schema([
+            (name, {'string': pa.string(), 'int': pa.int64(), 'float': pa.float64(),
+                    'timestamp': pa.timestamp('s')}[kind])
+            for name, kind in self.schema
+        ])
+        if replace:
+            shutil.rmtree(self._prefix(), ignore_errors=True)
+
+    def write(self, rows):
+        for row in rows:
+            self._buffer.append({name: _CONVERTERS[kind](row.get(name)) for name, kind in self.schema})
+            if len(self._buffer) >= self.batch_size:
+                self.flush()
+
+    def _partition(self, row):
+        value = row.get(self.date_field) if self.date_field else None
+        return (value or datetime.now()).strftime('%Y-%m-%d')
+
+    def flush(self):
+        """把缓冲的行按日期分区各写出一个文件"""
+        partitions = {}
+        for row in self._buffer:
+            partitions.setdefault(self._partition(row), []).append(row)
+        stamp = time.strftime('%Y%m%d%H%M%S')
+        for day, rows in partitions.items():
+            directory = os.path.join(self._prefix(), f'day={day}')
+            os.makedirs(directory, exist_ok=True)
+            table = self._pa.Table.from_pylist(rows, schema=self._arrow_schema)
+            path = os.path.join(directory, f'part-{stamp}-{os.getpid()}-{self._parts}.parquet')
+            self._pq.write_table(table, path)
+            self._parts += 1
+            self.count += len(rows)
+        self._buffer = []
+
+    def _prefix(self):
+        """来源与固定分区对应的目录"""
+        parts = [f'{key}={_safe(value)}' for key, value in self.partitions.items()]
+        return os.path.join(dataset_path(self.source, self.root), *parts)
+
+    def close(self):
+        if self._buffer:
+            self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _safe(value):
+    """分区值中不能出现路径分隔符和 '='"""
+    return re.sub(r'[\\/=:*?"<>|]', '_', str(value))
+
+
+def dataset_path(source, root='result/parquet'):
+    """某个来源的数据集目录"""
+    return os.path.join(root, f'source={_safe(source)}')
+
+
+class MultiSink:
+    """同一批数据同时写入多个输出"""
+
+    def __init__(self, sinks):
+        self.sinks = sinks
+
+    def write(self, rows):
+        rows = list(rows)
+        for sink in self.sinks:
+            sink.write(rows)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_sinks(csv_path, schema, source, formats=('csv',), date_field=None, partitions=None, append=False,
+               parquet_root='result/parquet', replace=False, batch_size=5000):
+    """
+    按 formats 打开输出
+    :param csv_path: CSV 文件路径
+    :param schema: [(列名, 类型)]，CSV 使用其中的列名
+    :param formats: 'csv'、'parquet' 的任意组合
+    :param date_field, partitions, replace, batch_size: 见 ParquetSink
+    :return: MultiSink
+    """
+    sinks = []
+    if 'csv' in formats:
+        sinks.append(CsvSink(csv_path, [name for name, _ in schema], append=append))
+    if 'parquet' in formats:
+        sinks.append(ParquetSink(parquet_root, schema, source, date_field=date_field, partitions=partitions,
+                                 replace=replace, batch_size=batch_size))
+    return MultiSink(sinks)
+
+
+def read_dataset(source, root='result/parquet', columns=None, filters=None):
+    """
+    以内存映射读取某个来源的数据集为 DataFrame，分区列上的 filters 会跳过不相关的文件
+    :param columns: 只读取这些列
+    :param filters: pyarrow 过滤条件，如 [('keyword', '=', 'Python')]
+    """
+    _, pq = _arrow('读取')
+    return pq.read_table(dataset_path(source, root), columns=columns, filters=filters,
+                         memory_map=True).to_pandas()
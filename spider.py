@@ -1,22 +1,94 @@
-import requests
-from bs4 import BeautifulSoup
+import os
+import asyncio
 import time
-import csv
 from tqdm import tqdm
-import random
-from fake_useragent import UserAgent
-ua = UserAgent()
-# 设置请求头模拟浏览器访问
-headers = {
-    'User-Agent': ua.random,
+from fetch_engine import AsyncFetcher
+from fetch_policy import FetchPolicy
+from http_cache import CachedSession
+from crawl_state import CrawlState
+from extractors import get_backend
+from sinks import open_sinks
+from metrics import metrics, profiled
+from user_agents import random_user_agent
+# 设置请求头模拟浏览器访问，User-Agent 在创建会话时才选取，导入模块时不读取 User-Agent 池
+BROWSER_HEADERS = {
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
     'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
     'Connection': 'keep-alive'
 }
+# 同步请求的限速与重试策略，按站点响应自动调整速率
+policy = FetchPolicy()
 
 # 基础URL
 BASE_URL = "https://shxyj.ajcass.com"
 DIRECTORY_URL = BASE_URL + "/Magazine/"
+FIELDNAMES = ["标题", "摘要", "英文摘要", "作者", "作者单位", "期刊", "年.期", "关键词", "文章链接"]
+# 输出列及类型，期刊字段均为文本
+ARTICLE_COLUMNS = [(name, 'string') for name in FIELDNAMES]
+# 详情页信息表：输出字段 -> (左列标签的可能写法, 是否取单元格内的<p>)
+ARTICLE_SCHEMA = {
+    "摘要": (("摘要", "中文摘要"), True),
+    "英文摘要": (("英文摘要", "Abstract"), True),
+    "作者": (("作者",), False),
+    "作者单位": (("作者单位", "单位"), False),
+    "期刊": (("期刊", "期刊名称", "刊名"), False),
+    "年.期": (("年·期", "年.期", "年期", "年/期"), False),
+    "关键词": (("关键词", "关键字"), False),
+}
+# 标签 -> 输出字段，解析时一次查表
+ARTICLE_LABELS = {label: field for field, (labels, _) in ARTICLE_SCHEMA.items() for label in labels}
+
+
+def request_headers():
+    """带随机 User-Agent 的浏览器请求头"""
+    return {'User-Agent': random_user_agent(), **BROWSER_HEADERS}
+
+
+def create_session():
+    """
+    带磁盘缓存的会话，重复运行时对未变化的页面发送条件请求
+    目录页随新文章发布而变化，每次都重新验证；文章页在有效期内直接使用缓存
+    """
+    cached = CachedSession(ttl_overrides={DIRECTORY_URL: 0})
+    cached.headers.update(request_headers())
+    return cached
+
+
+# 第一次请求时由 get_session() 创建；基准和回放可以直接替换为其他会话
+session = None
+
+
+def get_session():
+    """返回模块共用的会话，尚未创建时先创建"""
+    global session
+    if session is None:
+        session = create_session()
+    return session
+
+
+def directory_params(page):
+    """构造目录页查询参数"""
+    return {
+        'Year': '2024',
+        'PageIndex': page,
+        'Issue': '',
+        'JChannelID': '',
+        'Title': '',
+        'Authors': '',
+        'WorkUnit': ''
+    }
+
+
+def parse_directory_html(html, backend=None):
+    """
+    从目录页HTML中提取文章链接
+    :param backend: 解析后端名称，默认 lxml
+    :return: (文章链接列表, 表格行数)
+    """
+    parser = get_backend(backend)
+    with metrics.timer('crawler_parse_seconds', site='ajcass', page='directory'):
+        hrefs, item_count = parser.article_links(parser.parse(html))
+    return [BASE_URL + href for href in hrefs], item_count
 
 
 def get_article_links(page_count=3):
@@ -24,80 +96,89 @@ def get_article_links(page_count=3):
     article_links = []
 
     for page in range(1, page_count + 1):
-        # 构造目录页URL
-        params = {
-            'Year': '2024',
-            'PageIndex': page,
-            'Issue': '',
-            'JChannelID': '',
-            'Title': '',
-            'Authors': '',
-            'WorkUnit': ''
-        }
-
         try:
-            response = requests.get(DIRECTORY_URL, params=params, headers=headers, timeout=10)
+            response = policy.get(get_session(), DIRECTORY_URL, params=directory_params(page), timeout=10)
             response.raise_for_status()
 
-            soup = BeautifulSoup(response.text, 'html.parser')
-            # 找到所有文章项
-            items = soup.select('tr')
-            flag = True
-            for item in items:
-                if flag:  # 过滤表头
-                    flag = False
-                    continue
-                # 提取文章详情页链接
-                link = item.select_one('a[href^="/Magazine/show/?id="]')
-                if link:
-                    URL = BASE_URL + link['href']
-                    article_links.append(URL)
+            links, item_count = parse_directory_html(response.text)
+            article_links.extend(links)
 
-            print(f"已获取第 {page} 页，共 {len(items)} 篇文章链接")
-            time.sleep(random.uniform(1, 2))  # 随机延时
+            print(f"已获取第 {page} 页，共 {item_count} 篇文章链接")
 
         except Exception as e:
             print(f"获取第 {page} 页失败: {e}")
 
-    return article_links
+    # 相邻目录页可能重复列出同一篇文章，保持顺序去重
+    return list(dict.fromkeys(article_links))
 
 
 def parse_article_page(url):
     """解析单篇文章页面"""
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = policy.get(get_session(), url, timeout=10)
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # 提取文章标题
-        temp = soup.find('div', attrs={'class': 'C_right'}).find_all('div')
-        title = temp[0].get_text(strip=True) if temp[0].get_text(strip=True) else ""
-
-        # 提取作者信息
-        row = soup.find_all('tr')
-        temp = row[4].find_all('td')
-        author = temp[1].get_text(strip=True) if temp[1] else ""
-        temp = row[6].find_all('td')
-        work_unit = temp[1].get_text(strip=True) if temp[1] else ""
-
-        # 提取摘要
-        temp = row[1].find_all('td')
-        abstract = temp[1].find('p').get_text(strip=True) if temp[1] else ""
-        # 英文摘要
-        temp = row[2].find_all('td')
-        abstract_en = temp[1].find('p').get_text(strip=True) if temp[1] else ""
-
-        # 提取关键词
-        temp = row[16].find_all('td')
-        keywords = temp[1].get_text(strip=True) if temp[1] else ""
-
-        # 提取期刊信息
-        temp = row[8].find_all('td')
-        journal_name = temp[1].get_text(strip=True) if temp[1] else ""
-
-        # 提取年·期
-        temp = row[10].find_all('td')
-        year_issue = temp[1].get_text(strip=True) if temp[1] else ""
+    except Exception as e:
+        print(f"解析文章失败: {url} - {e}")
+        return None
+    return parse_article_html(response.text, url)
+
+
+def normalize_label(text):
+    """去掉标签中的空白和冒号"""
+    return ''.join(text.split()).rstrip(':：')
+
+
+def extract_article_fields(parser, doc):
+    """
+    单次遍历信息表的行，按左列标签文字填充 ARTICLE_SCHEMA 中的字段
+    :return: (字段字典, 未找到的字段列表)
+    """
+    fields = {}
+    for row in parser.rows(doc):
+        cells = parser.cells(row)
+        if len(cells) < 2:
+            continue
+        field = ARTICLE_LABELS.get(normalize_label(parser.text(cells[0])))
+        if field is None or field in fields:
+            continue
+        value_cell = cells[1]
+        if ARTICLE_SCHEMA[field][1]:
+            paragraph = parser.paragraph(value_cell)
+            if paragraph is not None:
+                value_cell = paragraph
+        fields[field] = parser.text(value_cell)
+    missing = [field for field in ARTICLE_SCHEMA if field not in fields]
+    for field in missing:
+        fields[field] = ""
+    return fields, missing
+
+
+def parse_article_html(html, url, backend=None):
+    """
+    从文章页面HTML中提取字段
+    :param backend: 解析后端名称，默认 lxml
+    """
+    parser = get_backend(backend)
+    try:
+        with metrics.timer('crawler_parse_seconds', site='ajcass', page='article'):
+            doc = parser.parse(html)
+
+            # 提取文章标题
+            title = parser.article_title(doc)
+
+            # 按标签提取信息表字段
+            fields, missing = extract_article_fields(parser, doc)
+        if len(missing) == len(ARTICLE_SCHEMA):
+            raise ValueError("页面中未找到任何信息表字段")
+        if missing:
+            print(f"文章缺少字段: {url} - {', '.join(missing)}")
+        abstract = fields["摘要"]
+        abstract_en = fields["英文摘要"]
+        author = fields["作者"]
+        work_unit = fields["作者单位"]
+        journal_name = fields["期刊"]
+        year_issue = fields["年.期"]
+        keywords = fields["关键词"]
         print({
             "标题": title,
             "摘要": abstract,
@@ -123,37 +204,146 @@ def parse_article_page(url):
 
     except Exception as e:
         print(f"解析文章失败: {url} - {e}")
+        metrics.inc('crawler_errors_total', site='ajcass', stage='parse')
         return None
 
 
-def main():
-    # 1. 获取文章链接
-    print("开始获取文章链接...")
-    article_links = get_article_links(3)
-    print(f"共获取到 {len(article_links)} 篇文章链接")
-
-    # 2. 爬取文章数据
-    articles_data = []
-    print("\n开始爬取文章详情...")
-
-    for link in tqdm(article_links, desc="爬取进度"):
-        article_data = parse_article_page(link)
-        if article_data:
-            articles_data.append(article_data)
-        time.sleep(random.uniform(1, 3))  # 随机延时防止被封
-
-    # 3. 保存到CSV文件
-    if articles_data:
-        filename = f"result/上海研究院期刊_2024_{time.strftime('%Y%m%d')}.csv"
-        with open(filename, 'w', newline='', encoding='utf-8-sig') as f:
-            fieldnames = ["标题", "摘要", "英文摘要", "作者", "作者单位", "期刊", "年.期", "关键词", "文章链接"]
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(articles_data)
-        print(f"\n数据已保存到: {filename}")
-        print(f"共爬取 {len(articles_data)} 篇文章")
+def parse_article_pages(urls, concurrency=8, per_host=4, rate=2.0):
+    """
+    并发解析多篇文章页面
+    :param urls: 文章链接列表
+    :param concurrency: 同时进行的请求数
+    :param per_host: 单个站点并发上限
+    :param rate: 初始每秒请求数，之后按站点响应自适应调整
+    :return: 与 urls 顺序一致的结果列表，失败项为 None
+    """
+    fetcher = AsyncFetcher(concurrency=concurrency, per_host=per_host, rate=rate, session=get_session())
+    progress = tqdm(total=len(urls), desc="爬取进度")
+
+    def handle(url, response):
+        progress.update(1)
+        return parse_article_html(response.text, url)
+
+    try:
+        results = fetcher.fetch_all(urls, handle)
+    finally:
+        progress.close()
+    return results
+
+
+async def _crawl_pipeline(fetcher, page_count, on_article, workers, state, on_directory=None):
+    """目录页生产链接，详情页工作协程边收边解析"""
+    fetcher.reset()
+    queue = asyncio.Queue(maxsize=workers * 4)
+    queued = set()  # 本次运行已入队的链接，相邻目录页可能重复列出同一篇文章
+
+    async def produce():
+        try:
+            for page in range(1, page_count + 1):
+                response = await fetcher.fetch(DIRECTORY_URL, params=directory_params(page))
+                if response is None:
+                    print(f"获取第 {page} 页失败")
+                    continue
+                links, item_count = parse_directory_html(response.text)
+                print(f"已获取第 {page} 页，共 {item_count} 篇文章链接")
+                if on_directory is not None:
+                    on_directory(page)
+                for link in links:
+                    # 已保存过的文章不再抓取
+                    if state is not None and state.is_visited(link):
+                        continue
+                    if link in queued:
+                        metrics.inc('crawler_duplicates_total', site='ajcass', kind='exact')
+                        continue
+                    queued.add(link)
+                    await queue.put(link)
+        finally:
+            for _ in range(workers):
+                await queue.put(None)
+
+    async def consume():
+        while True:
+            url = await queue.get()
+            if url is None:
+                return
+            response = await fetcher.fetch(url)
+            if response is None:
+                continue
+            article_data = parse_article_html(response.text, url)
+            if article_data:
+                # 先写出结果再记录状态，写出前进程中断时下次运行会重新抓取
+                on_article(article_data)
+                if state is not None:
+                    state.add_record('article', url, article_data)
+                    state.mark_visited(url)
+                metrics.inc('crawler_items_total', site='ajcass')
+
+    await asyncio.gather(produce(), *[consume() for _ in range(workers)])
+
+
+def crawl_articles(on_article, page_count=3, workers=8, per_host=4, rate=2.0, state=None, on_directory=None):
+    """
+    流水线爬取：第1页的链接立即交给详情页工作协程，同时继续获取后续目录页
+    :param on_article: 每解析完一篇文章即调用 on_article(article_data)
+    :param page_count: 目录页数
+    :param workers: 详情页工作协程数
+    :param state: CrawlState，提供时跳过已保存的文章并即时记录新文章
+    :param on_directory: 每成功获取一页目录即调用 on_directory(page)
+    :return: 重试后仍失败的链接，这些文章未记入 state，下次运行会重新抓取
+    """
+    fetcher = AsyncFetcher(concurrency=workers + 1, per_host=per_host, rate=rate, session=get_session())
+    asyncio.run(_crawl_pipeline(fetcher, page_count, on_article, workers, state, on_directory))
+    fetcher.policy.print_stats()
+    if fetcher.failed:
+        print(f"{len(fetcher.failed)} 个请求重试后仍失败，下次运行时重新抓取")
+    return fetcher.failed
+
+
+def main(formats=('csv',), metrics_format='json', profile_path=None, page_count=3):
+    """
+    :param formats: 输出格式，'csv'、'parquet' 的任意组合
+    :param metrics_format: 运行指标的输出格式，'json' 或 'prom'
+    :param profile_path: 提供时用 cProfile 记录本次运行并保存到该路径
+    :param page_count: 目录页数
+    :return: (成功获取的目录页数, 新文章数)
+    """
+    # 边爬取边写入结果文件，不在内存中保留全部文章
+    os.makedirs('result', exist_ok=True)
+    filename = f"result/上海研究院期刊_2024_{time.strftime('%Y%m%d')}.csv"
+    # 爬取状态持久化，中断后重新运行只抓取尚未保存的文章
+    state = CrawlState('cache/spider_state.sqlite')
+    print(f"开始爬取文章，已保存 {state.count('article')} 篇...")
+    progress = tqdm(desc="爬取进度")
+    count = 0
+    directory_pages = []
+    # 同一天内断点续爬时追加到已有文件
+    resume = os.path.exists(filename)
+    # 每篇文章写入后立即落盘（Parquet 每行一个文件），之后才记为已抓取
+    with open_sinks(filename, ARTICLE_COLUMNS, 'ajcass', formats=formats, append=resume, batch_size=1) as sink:
+
+        def save(article_data):
+            nonlocal count
+            sink.write([article_data])
+            count += 1
+            progress.update(1)
+
+        with profiled(profile_path):
+            crawl_articles(save, page_count=page_count, state=state, on_directory=directory_pages.append)
+    progress.close()
+    state.close()
+
+    if count:
+        print(f"\n数据已保存到: {filename}" if 'csv' in formats else "\n数据已保存到 Parquet 数据集")
+        print(f"共爬取 {count} 篇新文章")
+    elif resume:
+        print("没有新文章")
     else:
+        if 'csv' in formats:
+            os.remove(filename)
         print("未获取到有效数据")
+    get_session().cache.print_stats()
+    metrics.write_run('spider', metrics_format)
+    return len(directory_pages), count
 
 
 if __name__ == "__main__":
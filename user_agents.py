@@ -0,0 +1,72 @@
+"""
+User-Agent 池：首次使用时从 fake_useragent 的数据中取样并缓存到本地 JSON
+之后直接读缓存，导入爬虫模块时不再构造 UserAgent()
+"""
+import json
+import os
+import random
+import re
+import threading
+import time
+
+CACHE_PATH = 'cache/user_agents.json'
+# 缓存超过该时长（秒）后重新取样
+MAX_AGE = 30 * 24 * 3600
+POOL_SIZE = 200
+MOBILE = re.compile(r'Mobile|Android|iPhone|iPad|Windows Phone', re.IGNORECASE)
+# fake_useragent 不可用时的后备
+FALLBACK = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/124.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) '
+    'Version/17.4 Safari/605.1.15',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:125.0) Gecko/20100101 Firefox/125.0',
+]
+
+_pools = {}
+_lock = threading.Lock()
+
+
+def _sample(size):
+    """从 fake_useragent 的数据中按使用占比取最常见的 size 个，返回 {'any': [...], 'desktop': [...]}"""
+    try:
+        from fake_useragent import UserAgent
+    except ImportError:
+        return {'any': FALLBACK, 'desktop': FALLBACK}
+    ua = UserAgent()
+    data = getattr(ua, 'data_browsers', None)
+    if data:
+        ranked = [item['useragent'] for item in sorted(data, key=lambda item: -item.get('percent', 0))]
+    else:
+        # 旧版本没有公开数据列表，逐个取随机值（较慢）
+        ranked = [ua.random for _ in range(size * 3)]
+    # 正则过滤移动端关键词（忽略大小写）
+    desktop = [agent for agent in ranked if not MOBILE.search(agent)]
+    return {'any': list(dict.fromkeys(ranked))[:size] or FALLBACK,
+            'desktop': list(dict.fromkeys(desktop))[:size] or FALLBACK}
+
+
+def load_pool(path=CACHE_PATH, size=POOL_SIZE):
+    """读取本地缓存的 User-Agent 池，不存在或过期时重新取样并写入"""
+    with _lock:
+        if path in _pools:
+            return _pools[path]
+        pools = None
+        if os.path.exists(path) and time.time() - os.path.getmtime(path) < MAX_AGE:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    pools = json.load(f)
+            except (OSError, ValueError):
+                pools = None
+        if not pools:
+            pools = _sample(size)
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(pools, f, ensure_ascii=False, indent=2)
+        _pools[path] = pools
+        return pools
+
+
+def random_user_agent(desktop=False):
+    """随机返回一个 User-Agent，desktop=True 时只从桌面浏览器中选"""
+    return random.choice(load_pool()['desktop' if desktop else 'any'])
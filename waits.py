@@ -0,0 +1,71 @@
+"""
+Selenium 页面就绪等待：以具体信号代替固定 sleep
+- 文档加载完成、结果列表 DOM 不再变化、旧元素失效
+礼貌延时由 RateLimiter 单独控制
+selenium 在用到时才导入，接口模式等不需要浏览器的流程不必加载
+"""
+import threading
+import time
+
+from metrics import metrics
+
+# 在页面中记录目标节点最近一次变化的时间
+_OBSERVE_JS = """
+const root = document.querySelector(arguments[0]);
+if (!root) { return false; }
+if (!root.__mutationObserver) {
+    root.__lastMutation = performance.now();
+    root.__mutationObserver = new MutationObserver(() => { root.__lastMutation = performance.now(); });
+    root.__mutationObserver.observe(root, {childList: true, subtree: true, attributes: true, characterData: true});
+}
+return performance.now() - root.__lastMutation;
+"""
+
+
+class RateLimiter:
+    """
+    礼貌延时：保证相邻两次操作间隔不少于 interval 秒，可在线程间共享
+    已经耗费在等待页面上的时间会计入间隔
+    """
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self._last = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            delay = self._last + self.interval - time.monotonic()
+            if delay > 0:
+                metrics.observe('crawler_driver_wait_seconds', delay, wait='rate_limit')
+                time.sleep(delay)
+            self._last = time.monotonic()
+
+
+def wait_for_document_ready(driver, timeout=15):
+    """等待 document.readyState 为 complete"""
+    from selenium.webdriver.support.ui import WebDriverWait
+    with metrics.timer('crawler_driver_wait_seconds', wait='document_ready'):
+        WebDriverWait(driver, timeout).until(
+            lambda d: d.execute_script("return document.readyState") == "complete"
+        )
+
+
+def wait_for_dom_quiet(driver, css_selector, quiet=0.3, timeout=15):
+    """等待 css_selector 对应的节点出现，且 quiet 秒内没有 DOM 变化"""
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    def settled(d):
+        elapsed = d.execute_script(_OBSERVE_JS, css_selector)
+        return elapsed is not False and elapsed >= quiet * 1000
+    with metrics.timer('crawler_driver_wait_seconds', wait='dom_quiet'):
+        WebDriverWait(driver, timeout, poll_frequency=0.1).until(settled)
+
+
+def wait_for_stale(driver, element, timeout=15):
+    """等待旧元素从 DOM 中移除（翻页后旧结果被替换）"""
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    with metrics.timer('crawler_driver_wait_seconds', wait='stale'):
+        WebDriverWait(driver, timeout, poll_frequency=0.1).until(EC.staleness_of(element))